@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Job Scheduler - priority scheduling of recurring jobs for the market data fetcher.
+
+Jobs come due at period boundaries (bar closes) plus a settle delay and a random
+jitter, so load is spread out instead of spiking at the top of every hour. Due
+jobs are dispatched in priority order onto a shared worker pool, limited by
+per-provider budgets, and bulk jobs may never take the workers reserved for
+urgent ones. A job that comes due again while it is still queued or running is
+coalesced into the pending run instead of running twice.
+"""
+
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("market_data")
+
+# Lower values run first; jobs at BULK_PRIORITY or above may not use reserved workers
+HOT_PRIORITY = 0
+BULK_PRIORITY = 10
+
+def next_bar_close(period, now, delay=0):
+    """Get the epoch time of the first period boundary (shifted by delay) after now"""
+    return ((now - delay) // period + 1) * period + delay
+
+class Job:
+    """A recurring job and its scheduling state"""
+    
+    def __init__(self, key, func, period, args=(), delay=0, priority=BULK_PRIORITY, budget=None, jitter=0):
+        self.key = key
+        self.func = func
+        self.period = period
+        self.args = args
+        self.delay = delay
+        self.priority = priority
+        self.budget = budget
+        self.jitter = jitter
+        self.state = "waiting"  # "waiting" for its due time, "ready" to run, or "running"
+        self.due = None
+        self.rerun = False
+        self.runs = 0
+        self.coalesced = 0
+    
+    def next_due(self, now):
+        """Get the next due time after now: the next bar close, plus delay and jitter"""
+        return next_bar_close(self.period, now, self.delay) + random.uniform(0, self.jitter)
+
+class JobScheduler:
+    """Priority queue of recurring jobs run concurrently under per-provider budgets"""
+    
+    def __init__(self, max_workers, budgets=None, reserved_workers=0, clock=time.time):
+        self.max_workers = max_workers
+        self.budgets = budgets or {}
+        self.bulk_workers = max(1, max_workers - reserved_workers)
+        self.clock = clock
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.cond = threading.Condition()
+        self.jobs = {}
+        self.timers = []  # (due, seq, key) heap of waiting jobs
+        self.ready = []   # (priority, due, seq, key) heap of due jobs
+        self.seq = itertools.count()
+        self.running = 0
+        self.running_bulk = 0
+        self.budget_in_use = {}
+        self.stopped = False
+    
+    def every(self, key, func, period, args=(), delay=0, priority=BULK_PRIORITY, budget=None, jitter=0, run_now=False):
+        """Add a job due at every period boundary (in seconds since the epoch), delay seconds after it.
+        
+        The budget names a provider whose concurrency limit the job counts against.
+        """
+        with self.cond:
+            job = Job(key, func, period, args, delay, priority, budget, jitter)
+            self.jobs[key] = job
+            now = self.clock()
+            if run_now:
+                job.due = now
+                self._make_ready(job)
+            else:
+                self._arm(job, now)
+            self.cond.notify()
+        return job
+    
+    def trigger(self, key):
+        """Run a job as soon as possible; a job already queued or running is not run twice"""
+        with self.cond:
+            job = self.jobs[key]
+            if job.state == "waiting":
+                job.due = self.clock()
+                self._make_ready(job)
+                self.cond.notify()
+            elif job.state == "running":
+                job.rerun = True
+            else:
+                job.coalesced += 1
+    
+    def _arm(self, job, now):
+        job.state = "waiting"
+        job.due = job.next_due(now)
+        heapq.heappush(self.timers, (job.due, next(self.seq), job.key))
+    
+    def _make_ready(self, job):
+        job.state = "ready"
+        heapq.heappush(self.ready, (job.priority, job.due, next(self.seq), job.key))
+    
+    def _has_capacity(self, job):
+        if job.priority >= BULK_PRIORITY and self.running_bulk >= self.bulk_workers:
+            return False
+        if job.budget is not None and self.budget_in_use.get(job.budget, 0) >= self.budgets.get(job.budget, self.max_workers):
+            return False
+        return True
+    
+    def _dispatch(self, now):
+        """Move due jobs to the ready queue and start as many as the workers and budgets allow"""
+        while self.timers and self.timers[0][0] <= now:
+            due, _, key = heapq.heappop(self.timers)
+            job = self.jobs[key]
+            # Entries left behind by trigger() no longer match the job's due time
+            if job.state == "waiting" and job.due == due:
+                self._make_ready(job)
+        
+        # Jobs blocked by a busy budget stay queued without holding up the ones behind them
+        blocked = []
+        while self.ready and self.running < self.max_workers:
+            entry = heapq.heappop(self.ready)
+            job = self.jobs[entry[-1]]
+            if self._has_capacity(job):
+                self._start(job)
+            else:
+                blocked.append(entry)
+        for entry in blocked:
+            heapq.heappush(self.ready, entry)
+    
+    def _start(self, job):
+        job.state = "running"
+        self.running += 1
+        if job.priority >= BULK_PRIORITY:
+            self.running_bulk += 1
+        if job.budget is not None:
+            self.budget_in_use[job.budget] = self.budget_in_use.get(job.budget, 0) + 1
+        self.executor.submit(self._run, job)
+    
+    def _run(self, job):
+        try:
+            job.func(*job.args)
+        except Exception as e:
+            logger.error(f"Scheduled job {job.key} failed: {e}")
+        finally:
+            with self.cond:
+                self.running -= 1
+                if job.priority >= BULK_PRIORITY:
+                    self.running_bulk -= 1
+                if job.budget is not None:
+                    self.budget_in_use[job.budget] -= 1
+                job.runs += 1
+                
+                now = self.clock()
+                if job.rerun:
+                    job.rerun = False
+                    job.due = now
+                    self._make_ready(job)
+                else:
+                    # Bar closes that passed while the job was queued or running are
+                    # covered by this run; the next run waits for the next close
+                    if now > next_bar_close(job.period, job.due, job.delay):
+                        job.coalesced += 1
+                        logger.info(f"Coalesced overdue runs of scheduled job {job.key}")
+                    self._arm(job, now)
+                self.cond.notify()
+    
+    def run_forever(self):
+        """Dispatch jobs until stop() is called"""
+        with self.cond:
+            while not self.stopped:
+                now = self.clock()
+                self._dispatch(now)
+                timeout = max(self.timers[0][0] - now, 0) if self.timers else None
+                self.cond.wait(timeout)
+    
+    def stop(self, timeout=None):
+        """Stop dispatching and wait up to timeout seconds (None: no limit) for running jobs.
+        
+        Returns True if every running job finished.
+        """
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+            finished = self.cond.wait_for(lambda: self.running == 0, timeout)
+            if not finished:
+                logger.warning(f"{self.running} scheduled jobs still running at shutdown")
+        self.executor.shutdown(wait=finished, cancel_futures=True)
+        return finished
+    
+    def stats(self):
+        with self.cond:
+            return {
+                "jobs": len(self.jobs),
+                "ready": len(self.ready),
+                "running": self.running,
+                "runs": sum(job.runs for job in self.jobs.values()),
+                "coalesced": sum(job.coalesced for job in self.jobs.values())
+            }
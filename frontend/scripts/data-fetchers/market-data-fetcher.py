@@ -16,16 +16,39 @@ import os
 import json
 import time
 import logging
+import asyncio
+import threading
+import contextvars
 import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+import numpy as np
 import pandas as pd
-import schedule
 from pathlib import Path
 from datetime import datetime, timedelta
+from dateutil.tz import tzlocal
 import random
-from concurrent.futures import ThreadPoolExecutor
+import tempfile
+import hashlib
+import io
+import zipfile
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait as wait_futures
 from functools import lru_cache
 import shutil
 
+from job_scheduler import JobScheduler, HOT_PRIORITY, BULK_PRIORITY
+
+try:
+    import aiohttp  # Only needed by the asyncio fetch engine
+except ImportError:
+    aiohttp = None
+
+try:
+    import orjson  # Optional fast JSON encoder for output records
+except ImportError:
+    orjson = None
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -94,6 +117,14 @@ FMP_API_KEY = "da89fFQkNjDCwpoiH7VMglekEvkJbMF0"
 
 # Cache configuration
 CACHE_DIR = "cache"
+CACHE_FORMAT = "npz"  # "npz" (default), "parquet" (requires pyarrow) or "json" (legacy)
+
+# Last bar of every cached series, so price lookups never load a whole series
+LATEST_BARS_PATH = os.path.join(CACHE_DIR, "latest_bars.json")
+
+# In-memory LRU of decoded cache frames, bounded so the --schedule daemon stays small
+FRAME_CACHE_MAX_ENTRIES = 256
+FRAME_CACHE_MAX_BYTES = 256 * 1024 * 1024
 DEFAULT_CACHE_TTL = {
     "1m": 60 * 10,           # 10 minutes for 1-minute data
     "5m": 60 * 30,           # 30 minutes for 5-minute data
@@ -104,59 +135,817 @@ DEFAULT_CACHE_TTL = {
     "1d": 24 * 60 * 60       # 1 day for daily data
 }
 OUTPUT_DIR = "data"
+# Per-symbol CSV partitions merged into market_data_{interval}.csv once per batch
+OUTPUT_PARTITION_DIR = os.path.join(OUTPUT_DIR, "partitions")
+OUTPUT_COLUMNAR = True  # Also write market_data_{interval}.parquet when pyarrow is available
+# Record of what ensure_public_chart_data has published to public/chart-data
+PUBLISH_MANIFEST_PATH = os.path.join(OUTPUT_DIR, "published.json")
+# consolidate_output keeps per-file fragments and a manifest here, reprocessing only changed files
+CONSOLIDATED_DIR = os.path.join(OUTPUT_DIR, "consolidated")
+# Dated output snapshots compacted into one deduplicated series per (symbol, interval)
+ARCHIVE_DIR = os.path.join(OUTPUT_DIR, "archive")
+ARCHIVE_FORMAT = "npz"  # "npz" (deflated, default) or "parquet" (requires pyarrow)
+# Raw data/YYYY-MM-DD directories kept once they are archived; None keeps them all. Pruned days
+# also drop out of all_market_data.json/.csv, which are built from the dated directories
+ARCHIVE_RETENTION_DAYS = None
+# Historical exchange-rate cubes (time x base x quote), one memory-mapped .npy per interval
+RATE_CUBE_DIR = os.path.join(OUTPUT_DIR, "rate_cube")
+RATE_CUBE_INTERVALS = ["1d", "1h"]
+
+# Lookback period fetched for each interval
+LOOKBACK_DAYS = {
+    "1m": 1,
+    "5m": 3,
+    "15m": 5,
+    "30m": 5,
+    "1h": 7,
+    "4h": 30,
+    "1d": 365
+}
+
+# Approximate bars per day for each interval
+BARS_PER_DAY = {
+    "1m": 1440,
+    "5m": 288,
+    "15m": 96,
+    "30m": 48,
+    "1h": 24,
+    "4h": 6,
+    "1d": 1
+}
+
+# Length of one bar for each interval
+INTERVAL_DURATIONS = {
+    "1m": pd.Timedelta(minutes=1),
+    "5m": pd.Timedelta(minutes=5),
+    "15m": pd.Timedelta(minutes=15),
+    "30m": pd.Timedelta(minutes=30),
+    "1h": pd.Timedelta(hours=1),
+    "4h": pd.Timedelta(hours=4),
+    "1d": pd.Timedelta(days=1)
+}
+
+# Coarser intervals resampled locally whenever their base interval is fetched,
+# so they are served from the cache instead of costing their own provider calls
+DERIVED_INTERVALS = {
+    "1m": ["5m", "15m", "30m"],
+    "1h": ["4h", "1d"]
+}
+
+# Incremental mode: when the cache expires, fetch only bars after the last cached one
+# and merge them into the stored series instead of refetching the whole lookback window
+INCREMENTAL_FETCH = True
 MAX_WORKERS = 5  # Max parallel requests
 
+# Hedged requests - when the providers tried so far have not answered within the interval's
+# latency budget, the next one in the chain is started alongside them; the first series
+# returned wins and the others are cancelled. Every fetch gives up at its deadline.
+HEDGE_REQUESTS = True
+HEDGE_LATENCY_BUDGET = {"1m": 5, "5m": 5, "15m": 8, "30m": 8, "1h": 10, "4h": 15, "1d": 20}
+FETCH_DEADLINE = {"1m": 30, "5m": 30, "15m": 45, "30m": 45, "1h": 60, "4h": 90, "1d": 120}
+HEDGE_WORKERS = MAX_WORKERS * 4  # Threads running provider attempts, up to a full chain per worker
+
+# HTTP connection pooling - one keep-alive session per provider host
+HTTP_POOL_SIZE = MAX_WORKERS  # Connections kept open per host, one per worker thread
+HTTP_TIMEOUT = 30
+HTTP_HEADERS = {
+    # Yahoo rejects the default python-requests agent with 429s
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) market-data-fetcher/1.0",
+    "Accept": "application/json"
+}
+
+# Batch quote requests - symbols per call on each provider's multi-symbol endpoint
+YAHOO_QUOTE_BATCH_SIZE = 50
+TWELVEDATA_BATCH_SIZE = 8     # Each symbol costs one credit; matches the per-minute credits
+COINGECKO_BATCH_SIZE = 100
+
+# Asyncio engine - concurrent requests allowed per provider (replaces MAX_WORKERS there)
+PROVIDER_CONCURRENCY = {
+    "YahooFinance": 8,
+    "CoinGecko": 3,
+    "AlphaVantage": 1,
+    "TwelveData": 2
+}
+ASYNC_CONNECTIONS_PER_HOST = 8
+
+# Job scheduler (job_scheduler.py) - one refresh job per (period, interval, primary provider), due
+# at its bar closes, run on MAX_WORKERS workers with PROVIDER_CONCURRENCY as the per-provider budgets
+SCHEDULER_RESERVED_WORKERS = 2  # Workers the nightly bulk refresh may not take, kept for hot jobs
+SCHEDULER_SETTLE_DELAY = 60     # Seconds after a bar close before a refresh is due
+SCHEDULER_JITTER = 300          # Up to this many seconds added to each due time to spread load
+SCHEDULER_PUBLISH_PERIOD = 15 * 60  # Refreshed outputs are merged and published this often
+SCHEDULER_STOP_TIMEOUT = 120    # Seconds to wait at shutdown for running jobs before closing sessions
+
+# Provider rate limits as token buckets, matched to each free tier.
+# "calls" tokens are refilled every "per" seconds, up to "burst" at once.
+PROVIDER_RATE_LIMITS = {
+    "YahooFinance": [
+        {"calls": 2000, "per": 60 * 60, "burst": 10}     # Unofficial, ~2000 calls/hour
+    ],
+    "CoinGecko": [
+        {"calls": 30, "per": 60, "burst": 5}             # Public API, ~30 calls/minute
+    ],
+    "AlphaVantage": [
+        {"calls": 5, "per": 60, "burst": 5},             # 5 calls/minute
+        {"calls": 25, "per": 24 * 60 * 60, "burst": 25}  # 25 calls/day
+    ],
+    "TwelveData": [
+        {"calls": 8, "per": 60, "burst": 8},             # 8 API credits/minute
+        {"calls": 800, "per": 24 * 60 * 60, "burst": 800}  # 800 API credits/day
+    ]
+}
+RATE_LIMIT_MAX_WAIT = 90       # Give up on a provider rather than block longer than this
+RATE_LIMIT_PENALTY = 30        # Default cool-down after a 429 without Retry-After
+RATE_LIMIT_MIN_SCALE = 0.1     # Lowest fraction of the configured rate after repeated 429s
+
+# Provider circuit breakers, persisted so a restart keeps what was learned
+PROVIDER_HEALTH_PATH = os.path.join(CACHE_DIR, "provider_health.json")
+CIRCUIT_FAILURE_THRESHOLD = 5      # Consecutive failed requests that open a provider's circuit
+CIRCUIT_MIN_SUCCESS_RATE = 0.2     # A rolling success rate below this also opens it
+CIRCUIT_OPEN_SECONDS = 5 * 60      # Cool-down before a half-open probe, doubled after each failed probe
+CIRCUIT_MAX_OPEN_SECONDS = 60 * 60
+HEALTH_WINDOW = 50                 # Recent requests kept for success-rate and latency stats
+HEALTH_DEGRADED_RATE = 0.8         # Providers below this success rate move behind healthy ones
+
+# Provider that last returned good data for each (symbol, interval), tried first on the next refresh
+ROUTING_TABLE_PATH = os.path.join(CACHE_DIR, "routing.json")
+ROUTING_EXPLORE_SECONDS = 24 * 60 * 60  # A routed series walks its full chain again this often
+
+# Negative cache of (symbol, interval, provider) lookups that came back without data,
+# skipped for a TTL that doubles with every further failure
+NEGATIVE_CACHE_PATH = os.path.join(CACHE_DIR, "negative_cache.json")
+NEGATIVE_CACHE_BASE_TTL = 60 * 60             # First failure suppresses the lookup for an hour
+NEGATIVE_CACHE_MAX_TTL = 7 * 24 * 60 * 60
+NEGATIVE_CACHE_DEAD_FAILURES = 5              # Failures on every provider before a symbol is reported dead
+DEAD_SYMBOLS_PATH = os.path.join(OUTPUT_DIR, "dead_symbols.json")
+
 # Define all supported intervals
 INTERVALS = ["1m", "5m", "15m", "30m", "1h", "4h", "1d"]
 
+# ----- HTTP Connection Layer -----
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def get_session(url):
+    """Get the shared keep-alive session for the host of the given URL"""
+    host = urlparse(url).netloc
+    session = _sessions.get(host)
+    if session is not None:
+        return session
+    
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(HTTP_HEADERS)
+            _sessions[host] = session
+            logger.debug(f"Opened HTTP session pool for {host} ({HTTP_POOL_SIZE} connections)")
+    return session
+
+def close_sessions():
+    """Close all pooled HTTP sessions"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+class AsyncHttpClient:
+    """Pooled aiohttp session with per-provider concurrency limits for the asyncio engine"""
+    
+    def __init__(self, concurrency=None):
+        if aiohttp is None:
+            raise RuntimeError("The asyncio fetch engine requires aiohttp (pip install aiohttp)")
+        self.concurrency = concurrency or PROVIDER_CONCURRENCY
+        self.session = None
+        self.semaphores = {}
+        self.locks = {}
+    
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=0, limit_per_host=ASYNC_CONNECTIONS_PER_HOST, ttl_dns_cache=300)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers=HTTP_HEADERS,
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT)
+        )
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.session.close()
+    
+    def get(self, url, params=None, headers=None):
+        return self.session.get(url, params=params, headers=headers)
+    
+    def slot(self, provider):
+        """Semaphore limiting in-flight requests to a provider"""
+        semaphore = self.semaphores.get(provider)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.concurrency.get(provider, 2))
+            self.semaphores[provider] = semaphore
+        return semaphore
+    
+    def lock(self, name):
+        """Named lock for one-off initialisation shared by many coroutines"""
+        lock = self.locks.get(name)
+        if lock is None:
+            lock = asyncio.Lock()
+            self.locks[name] = lock
+        return lock
+
+# ----- Rate Limiting -----
+class TokenBucket:
+    """Token bucket refilled continuously at a fixed rate"""
+    
+    def __init__(self, calls, per, burst):
+        self.rate = calls / per  # Tokens per second
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+    
+    def refill(self, now, scale=1.0):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate * scale)
+        self.updated = now
+    
+    def wait_time(self, cost, scale=1.0):
+        """Seconds until the bucket holds enough tokens for the given cost"""
+        if self.tokens >= cost:
+            return 0.0
+        return (cost - self.tokens) / (self.rate * scale)
+
+class RateLimiter:
+    """Thread-safe rate limiter for one provider, shared by all source instances"""
+    
+    def __init__(self, name, limits):
+        self.name = name
+        self.buckets = [TokenBucket(**limit) for limit in limits]
+        self.blocked_until = 0.0
+        self.scale = 1.0  # Shrinks on 429s, recovers on successful calls
+        self.lock = threading.Lock()
+    
+    def reserve(self, cost=1, max_wait=RATE_LIMIT_MAX_WAIT):
+        """Reserve tokens and return how long the caller must wait before sending.
+        
+        Returns None without reserving anything if the wait would exceed max_wait,
+        e.g. when a daily quota is exhausted.
+        """
+        with self.lock:
+            now = time.monotonic()
+            for bucket in self.buckets:
+                bucket.refill(now, self.scale)
+            
+            wait = max([self.blocked_until - now, 0.0] +
+                       [bucket.wait_time(cost, self.scale) for bucket in self.buckets])
+            if max_wait is not None and wait > max_wait:
+                return None
+            
+            # Tokens may go negative: later callers queue up behind this reservation
+            for bucket in self.buckets:
+                bucket.tokens -= cost
+            return wait
+    
+    def acquire(self, cost=1, max_wait=RATE_LIMIT_MAX_WAIT):
+        """Block until tokens are available. Returns False if the budget is exhausted."""
+        wait = self.reserve(cost, max_wait)
+        if wait is None:
+            return False
+        if wait > 0:
+            if wait >= 1:
+                logger.info(f"Rate limit for {self.name}, sleeping for {wait:.2f}s")
+            time.sleep(wait)
+        return True
+    
+    def penalize(self, headers=None):
+        """Back off after a rate-limit response. Returns the cool-down in seconds."""
+        delay = _parse_retry_after(headers) or RATE_LIMIT_PENALTY
+        with self.lock:
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + delay)
+            self.scale = max(RATE_LIMIT_MIN_SCALE, self.scale / 2)
+            for bucket in self.buckets:
+                bucket.tokens = min(bucket.tokens, 0.0)
+                bucket.updated = now
+        return delay
+    
+    def observe(self, headers):
+        """Adapt to a successful response and any quota headers it carries"""
+        remaining = _parse_remaining_quota(headers)
+        with self.lock:
+            self.scale = min(1.0, self.scale * 1.05)
+            if remaining is None:
+                return
+            
+            # The provider's count is authoritative for the shortest window
+            bucket = self.buckets[0]
+            bucket.tokens = min(bucket.tokens, float(remaining))
+            if remaining <= 0:
+                reset = _parse_quota_reset(headers)
+                if reset:
+                    self.blocked_until = max(self.blocked_until, time.monotonic() + reset)
+
+def _header_number(headers, *names):
+    """Get the first numeric value among the given response headers"""
+    if not headers:
+        return None
+    for name in names:
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+def _parse_retry_after(headers):
+    """Seconds to wait according to a Retry-After header (delta-seconds form only)"""
+    return _header_number(headers, "Retry-After")
+
+def _parse_remaining_quota(headers):
+    """Calls left in the current window, from standard or Twelve Data headers"""
+    return _header_number(headers, "X-RateLimit-Remaining", "api-credits-left")
+
+def _parse_quota_reset(headers):
+    """Seconds until the quota window resets"""
+    reset = _header_number(headers, "X-RateLimit-Reset")
+    if reset is None:
+        return None
+    # Some providers send an epoch timestamp rather than a delay
+    if reset > 10 ** 9:
+        reset = reset - time.time()
+    return max(reset, 0.0)
+
+def _is_rate_limit_body(data):
+    """Detect rate-limit errors that are returned with a 200 status"""
+    if not isinstance(data, dict):
+        return False
+    # Twelve Data: {"code": 429, "status": "error", ...}
+    if data.get("status") == "error" and data.get("code") == 429:
+        return True
+    # Alpha Vantage: {"Note": "...call frequency..."} or {"Information": "...rate limit..."}
+    message = data.get("Note") or data.get("Information")
+    if isinstance(message, str):
+        message = message.lower()
+        return "frequency" in message or "rate limit" in message
+    return False
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+def get_rate_limiter(name):
+    """Get the shared rate limiter for a provider"""
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(name)
+        if limiter is None:
+            limits = PROVIDER_RATE_LIMITS.get(name, [{"calls": 1, "per": 1, "burst": 1}])
+            limiter = RateLimiter(name, limits)
+            _rate_limiters[name] = limiter
+        return limiter
+
+# ----- Provider Health -----
+class ProviderHealth:
+    """Circuit breaker (closed/open/half-open) with rolling request stats for one provider.
+    
+    Open circuits carry a wall-clock deadline so a persisted breaker survives restarts.
+    """
+    
+    def __init__(self, name):
+        self.name = name
+        self.state = "closed"
+        self.open_until = 0.0
+        self.open_seconds = CIRCUIT_OPEN_SECONDS
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+        self.results = deque(maxlen=HEALTH_WINDOW)  # (ok, latency or None)
+        self.lock = threading.Lock()
+    
+    def available(self):
+        """Check whether the chain should try this provider (without claiming a probe)"""
+        with self.lock:
+            if self.state == "open":
+                return time.time() >= self.open_until
+            return not (self.state == "half-open" and self.probe_in_flight)
+    
+    def allow(self):
+        """Claim permission to send a request; an open circuit past its cool-down admits one probe"""
+        with self.lock:
+            if self.state == "open":
+                if time.time() < self.open_until:
+                    return False
+                self.state = "half-open"
+                logger.info(f"{self.name} circuit half-open, probing")
+            if self.state == "half-open":
+                if self.probe_in_flight:
+                    return False
+                self.probe_in_flight = True
+            return True
+    
+    def release(self):
+        """End a request whose outcome says nothing about provider health (rate limits, bad symbols)"""
+        with self.lock:
+            self.probe_in_flight = False
+    
+    def record_success(self, latency):
+        with self.lock:
+            if self.state != "closed":
+                # Failures from before the outage ended no longer describe the provider
+                logger.info(f"{self.name} circuit closed")
+                self.state = "closed"
+                self.open_seconds = CIRCUIT_OPEN_SECONDS
+                self.results.clear()
+            self.results.append((True, latency))
+            self.consecutive_failures = 0
+            self.probe_in_flight = False
+    
+    def record_failure(self):
+        with self.lock:
+            self.results.append((False, None))
+            self.consecutive_failures += 1
+            self.probe_in_flight = False
+            if self.state == "half-open":
+                # A failed probe reopens the circuit for twice as long
+                self.open_seconds = min(self.open_seconds * 2, CIRCUIT_MAX_OPEN_SECONDS)
+                self._open()
+            elif self.state == "closed" and (self.consecutive_failures >= CIRCUIT_FAILURE_THRESHOLD or
+                                             (len(self.results) >= CIRCUIT_FAILURE_THRESHOLD and
+                                              self._success_rate() < CIRCUIT_MIN_SUCCESS_RATE)):
+                self._open()
+    
+    def _open(self):
+        self.state = "open"
+        self.open_until = time.time() + self.open_seconds
+        logger.warning(f"{self.name} circuit open for {self.open_seconds:.0f}s "
+                       f"after {self.consecutive_failures} consecutive failures")
+    
+    def _success_rate(self):
+        if not self.results:
+            return 1.0
+        return sum(ok for ok, _ in self.results) / len(self.results)
+    
+    def _mean_latency(self):
+        latencies = [latency for ok, latency in self.results if ok]
+        return sum(latencies) / len(latencies) if latencies else 0.0
+    
+    def score(self):
+        """Health score in [0, 1]: rolling success rate, discounted by mean latency"""
+        with self.lock:
+            return self._success_rate() / (1 + self._mean_latency() / HTTP_TIMEOUT)
+    
+    def is_degraded(self):
+        with self.lock:
+            return self.state != "closed" or self._success_rate() < HEALTH_DEGRADED_RATE
+    
+    def to_dict(self):
+        with self.lock:
+            return {
+                "state": "open" if self.state == "half-open" else self.state,
+                "open_until": self.open_until,
+                "open_seconds": self.open_seconds,
+                "consecutive_failures": self.consecutive_failures,
+                "results": list(self.results)
+            }
+    
+    def load(self, data):
+        with self.lock:
+            self.state = data.get("state", "closed")
+            self.open_until = data.get("open_until", 0.0)
+            self.open_seconds = data.get("open_seconds", CIRCUIT_OPEN_SECONDS)
+            self.consecutive_failures = data.get("consecutive_failures", 0)
+            self.results.extend((bool(ok), latency) for ok, latency in data.get("results", []))
+    
+    def stats(self):
+        with self.lock:
+            return {
+                "state": self.state,
+                "success_rate": round(self._success_rate(), 3),
+                "mean_latency": round(self._mean_latency(), 3),
+                "requests": len(self.results)
+            }
+
+_provider_health = {}
+_provider_health_lock = threading.Lock()
+
+def get_provider_health(name):
+    """Get the shared circuit breaker for a provider, restoring persisted state on first use"""
+    with _provider_health_lock:
+        if not _provider_health:
+            try:
+                with open(PROVIDER_HEALTH_PATH, "r") as f:
+                    saved = json.load(f)
+            except (FileNotFoundError, ValueError):
+                saved = {}
+            for provider, data in saved.items():
+                _provider_health[provider] = ProviderHealth(provider)
+                _provider_health[provider].load(data)
+        health = _provider_health.get(name)
+        if health is None:
+            health = ProviderHealth(name)
+            _provider_health[name] = health
+        return health
+
+def save_provider_health():
+    """Persist every provider's circuit state and recent stats"""
+    with _provider_health_lock:
+        states = {name: health.to_dict() for name, health in _provider_health.items()}
+    if not states:
+        return
+    try:
+        Path(CACHE_DIR).mkdir(parents=True, exist_ok=True)
+        atomic_write(PROVIDER_HEALTH_PATH, json.dumps(states))
+    except Exception as e:
+        logger.error(f"Error saving provider health: {e}")
+
+def log_provider_health():
+    with _provider_health_lock:
+        providers = list(_provider_health.items())
+    for name, health in providers:
+        stats = health.stats()
+        logger.info(f"Provider {name}: circuit {stats['state']}, {stats['success_rate']:.0%} of "
+                    f"{stats['requests']} recent requests succeeded, mean latency {stats['mean_latency']:.2f}s")
+
+def order_by_health(sources):
+    """Reorder a fallback chain: healthy providers keep their configured order, degraded ones
+    follow by health score, and providers with an open circuit are left out"""
+    available = [source for source in sources if source.health.available()]
+    healthy = [source for source in available if not source.health.is_degraded()]
+    degraded = sorted((source for source in available if source.health.is_degraded()),
+                      key=lambda source: -source.health.score())
+    skipped = len(sources) - len(available)
+    if skipped:
+        logger.debug(f"Skipping {skipped} providers with open circuits")
+    return healthy + degraded
+
 # ----- Data Source Classes -----
+def epoch_to_local(values, unit="s"):
+    """Convert a column of epoch timestamps to naive local datetimes, as datetime.fromtimestamp does per value"""
+    stamps = pd.to_datetime(values, unit=unit, utc=True).tz_convert(tzlocal()).tz_localize(None)
+    return stamps.rename("timestamp")
+
+def parse_iso_index(values):
+    """Parse a column of "YYYY-MM-DD" or "YYYY-MM-DD HH:MM:SS" strings into a DatetimeIndex"""
+    return pd.DatetimeIndex(pd.to_datetime(values, format="ISO8601"), name="timestamp")
+
+def invert_ohlc(bars):
+    """Invert the prices of a rate quoted the other way round (XXX per USD to USD per XXX).
+    
+    Works on a DataFrame or a single quote dict; the inverted high comes from the low
+    and vice versa.
+    """
+    inverted = bars.copy()
+    inverted["open"] = 1.0 / bars["open"]
+    inverted["high"] = 1.0 / bars["low"]
+    inverted["low"] = 1.0 / bars["high"]
+    inverted["close"] = 1.0 / bars["close"]
+    return inverted
+
+# Set when a request was not answered because of the provider (open circuit, exhausted budget,
+# server errors) rather than the symbol; per thread and per asyncio task
+_provider_unavailable = contextvars.ContextVar("provider_unavailable", default=False)
+
+# Cancel event and monotonic deadline of the fetch a request belongs to (set by hedged fetches)
+_request_cancel = contextvars.ContextVar("request_cancel", default=None)
+_request_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+def request_time_left():
+    """Seconds left before the current fetch's deadline, or None without a deadline"""
+    deadline = _request_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+def request_abandoned():
+    """Check whether the current fetch was cancelled or ran past its deadline"""
+    cancel = _request_cancel.get()
+    time_left = request_time_left()
+    return (cancel is not None and cancel.is_set()) or (time_left is not None and time_left <= 0)
+
+def backoff_sleep(seconds):
+    """Sleep between retries, waking early when the current fetch is cancelled or due"""
+    time_left = request_time_left()
+    if time_left is not None:
+        seconds = max(min(seconds, time_left), 0)
+    cancel = _request_cancel.get()
+    if cancel is not None:
+        cancel.wait(seconds)
+    else:
+        time.sleep(seconds)
+
 class DataSource:
     """Base class for all data sources"""
     
+    # Whether fetch_many can request several symbols' time series in one call
+    supports_batch_series = False
+    
+    # Whether each bar's volume is a rolling 24h total rather than the bar's own volume
+    rolling_volume = False
+    
     def __init__(self, name):
         self.name = name
-        self.rate_limit_reset = 0
+        self.rate_limiter = get_rate_limiter(name)
+        self.health = get_provider_health(name)
     
-    def fetch(self, symbol, interval, start_date, end_date):
+    def fetch(self, symbol, interval="1h", start_date=None, end_date=None):
         """Fetch data for the given symbol and timeframe"""
-        raise NotImplementedError("Subclasses must implement this method")
+        request = self._build_request(symbol, interval, start_date, end_date)
+        if request is None:
+            return None
+        data = self._make_request(request["url"], params=request["params"])
+        return self._parse_response(data, symbol, interval, start_date, end_date, request)
+    
+    async def fetch_async(self, http, symbol, interval="1h", start_date=None, end_date=None):
+        """Fetch data on the asyncio engine using the given AsyncHttpClient"""
+        request = self._build_request(symbol, interval, start_date, end_date)
+        if request is None:
+            return None
+        data = await self._make_request_async(http, request["url"], params=request["params"])
+        return self._parse_response(data, symbol, interval, start_date, end_date, request)
+    
+    def fetch_many(self, symbols, interval="1h", start_date=None, end_date=None):
+        """Fetch data for several symbols, returning {symbol: DataFrame}.
+        
+        Symbols a successful response returned no data for map to None; symbols
+        whose request failed are left out.
+        """
+        frames = {}
+        for symbol in symbols:
+            df = self.fetch(symbol, interval, start_date, end_date)
+            if df is not None or not _provider_unavailable.get():
+                frames[symbol] = df
+        return frames
     
-    def _handle_rate_limits(self):
-        """Handle rate limiting with exponential backoff"""
-        current_time = time.time()
-        if current_time < self.rate_limit_reset:
-            sleep_time = self.rate_limit_reset - current_time + random.uniform(0.1, 1.0)
-            logger.info(f"Rate limit for {self.name}, sleeping for {sleep_time:.2f}s")
-            time.sleep(sleep_time)
+    async def fetch_many_async(self, http, symbols, interval="1h", start_date=None, end_date=None):
+        """Asyncio version of fetch_many"""
+        async def fetch_one(symbol):
+            df = await self.fetch_async(http, symbol, interval, start_date, end_date)
+            return df, _provider_unavailable.get()
+        
+        results = await asyncio.gather(*(fetch_one(symbol) for symbol in symbols))
+        return {symbol: df for symbol, (df, unavailable) in zip(symbols, results) if df is not None or not unavailable}
+    
+    def fetch_quotes(self, symbols):
+        """Fetch the latest quote for many symbols in as few requests as possible.
         
-        # Set a new rate limit reset time with jitter
-        self.rate_limit_reset = time.time() + random.uniform(1.0, 3.0)
+        Returns {symbol: {"timestamp", "open", "high", "low", "close", "volume"}} for the
+        symbols the provider answered. Sources without a batch endpoint return {}.
+        """
+        return {}
+    
+    def _build_request(self, symbol, interval, start_date, end_date):
+        """Build the request URL and params for a symbol, or None to skip this source"""
+        raise NotImplementedError("Subclasses must implement this method")
+    
+    def _parse_response(self, data, symbol, interval, start_date, end_date, request):
+        """Convert the provider response into an OHLCV DataFrame"""
+        raise NotImplementedError("Subclasses must implement this method")
+    
+    def _handle_rate_limits(self, cost=1):
+        """Wait for the provider's shared rate limiter. Returns False if the budget is exhausted
+        or the wait would run past the current fetch's deadline."""
+        time_left = request_time_left()
+        if time_left is not None:
+            return self.rate_limiter.acquire(cost, max_wait=min(RATE_LIMIT_MAX_WAIT, time_left))
+        return self.rate_limiter.acquire(cost)
     
-    def _make_request(self, url, params=None, headers=None, max_retries=3):
-        """Make HTTP request with retry logic"""
+    def _make_request(self, url, params=None, headers=None, max_retries=3, cost=1):
+        """Make HTTP request with retry logic, failing fast while the provider's circuit is open.
+        
+        A cancelled or overdue fetch stops retrying, and each request's timeout is
+        clipped to the time left before the fetch's deadline.
+        """
+        _provider_unavailable.set(False)
         for attempt in range(max_retries):
+            if request_abandoned():
+                _provider_unavailable.set(True)
+                return None
+            if not self.health.allow():
+                logger.warning(f"{self.name} circuit open, skipping request")
+                _provider_unavailable.set(True)
+                return None
             try:
-                self._handle_rate_limits()
-                response = requests.get(url, params=params, headers=headers, timeout=30)
+                if not self._handle_rate_limits(cost):
+                    self.health.release()
+                    logger.warning(f"{self.name} request budget exhausted, skipping request")
+                    _provider_unavailable.set(True)
+                    return None
+                time_left = request_time_left()
+                timeout = HTTP_TIMEOUT if time_left is None else max(min(HTTP_TIMEOUT, time_left), 0.1)
+                started = time.monotonic()
+                response = get_session(url).get(url, params=params, headers=headers, timeout=timeout)
                 
+                rate_limited = response.status_code == 429  # Too Many Requests
                 if response.status_code == 200:
-                    return response.json()
+                    # A body that is not JSON (an interstitial or CDN error page) is a provider
+                    # problem, not a symbol one: it raises and is retried as a failed request
+                    data = response.json()
+                    # Alpha Vantage and Twelve Data report rate limits in a 200 body
+                    rate_limited = _is_rate_limit_body(data)
+                    if not rate_limited:
+                        self.rate_limiter.observe(response.headers)
+                        self.health.record_success(time.monotonic() - started)
+                        return data
                 
-                if response.status_code == 429:  # Too Many Requests
-                    wait_time = 2 ** attempt + random.uniform(0, 1)
-                    logger.warning(f"{self.name} rate limited. Waiting {wait_time:.2f}s. Attempt {attempt+1}/{max_retries}")
-                    time.sleep(wait_time)
+                if rate_limited:
+                    self.health.release()
+                    wait_time = self.rate_limiter.penalize(response.headers)
+                    logger.warning(f"{self.name} rate limited. Backing off {wait_time:.2f}s. Attempt {attempt+1}/{max_retries}")
                     continue
                 
+                if 400 <= response.status_code < 500:
+                    # Unknown symbol or bad parameters: a retry cannot succeed and the provider is fine
+                    self.health.release()
+                    logger.error(f"{self.name} API error: Status {response.status_code}, Response: {response.text}")
+                    return None
+                
+                self.health.record_failure()
                 logger.error(f"{self.name} API error: Status {response.status_code}, Response: {response.text}")
                 
             except Exception as e:
+                # A request cut short by the fetch deadline says nothing about the provider
+                if request_abandoned():
+                    self.health.release()
+                else:
+                    self.health.record_failure()
                 logger.error(f"{self.name} request failed: {e}. Attempt {attempt+1}/{max_retries}")
                 
             # Exponential backoff
             wait_time = 2 ** attempt + random.uniform(0, 1)
-            time.sleep(wait_time)
+            backoff_sleep(wait_time)
+        
+        _provider_unavailable.set(True)
+        return None
+    
+    async def _make_request_async(self, http, url, params=None, headers=None, max_retries=3, cost=1):
+        """Make HTTP request on the event loop with the same retry logic as _make_request"""
+        _provider_unavailable.set(False)
+        for attempt in range(max_retries):
+            if request_abandoned():
+                _provider_unavailable.set(True)
+                return None
+            if not self.health.allow():
+                logger.warning(f"{self.name} circuit open, skipping request")
+                _provider_unavailable.set(True)
+                return None
+            try:
+                # A wait that would run past the fetch's deadline is refused like an exhausted budget
+                time_left = request_time_left()
+                max_wait = RATE_LIMIT_MAX_WAIT if time_left is None else min(RATE_LIMIT_MAX_WAIT, time_left)
+                wait = self.rate_limiter.reserve(cost, max_wait=max_wait)
+                if wait is None:
+                    self.health.release()
+                    logger.warning(f"{self.name} request budget exhausted, skipping request")
+                    _provider_unavailable.set(True)
+                    return None
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                
+                started = time.monotonic()
+                async with http.slot(self.name):
+                    async with http.get(url, params=params, headers=headers) as response:
+                        status = response.status
+                        response_headers = response.headers
+                        text = await response.text() if status != 429 else ""
+                
+                rate_limited = status == 429  # Too Many Requests
+                if status == 200:
+                    # A body that is not JSON (an interstitial or CDN error page) is a provider
+                    # problem, not a symbol one: it raises and is retried as a failed request
+                    data = json.loads(text)
+                    # Alpha Vantage and Twelve Data report rate limits in a 200 body
+                    rate_limited = _is_rate_limit_body(data)
+                    if not rate_limited:
+                        self.rate_limiter.observe(response_headers)
+                        self.health.record_success(time.monotonic() - started)
+                        return data
+                
+                if rate_limited:
+                    self.health.release()
+                    wait_time = self.rate_limiter.penalize(response_headers)
+                    logger.warning(f"{self.name} rate limited. Backing off {wait_time:.2f}s. Attempt {attempt+1}/{max_retries}")
+                    continue
+                
+                if 400 <= status < 500:
+                    # Unknown symbol or bad parameters: a retry cannot succeed and the provider is fine
+                    self.health.release()
+                    logger.error(f"{self.name} API error: Status {status}, Response: {text}")
+                    return None
+                
+                self.health.record_failure()
+                logger.error(f"{self.name} API error: Status {status}, Response: {text}")
+                
+            except asyncio.CancelledError:
+                self.health.release()
+                raise
+            except Exception as e:
+                self.health.record_failure()
+                logger.error(f"{self.name} request failed: {e}. Attempt {attempt+1}/{max_retries}")
+            
+            # Exponential backoff without blocking the event loop, cut short by the deadline
+            wait_time = 2 ** attempt + random.uniform(0, 1)
+            time_left = request_time_left()
+            if time_left is not None:
+                wait_time = max(min(wait_time, time_left), 0)
+            await asyncio.sleep(wait_time)
         
+        _provider_unavailable.set(True)
         return None
 
 class YahooFinanceSource(DataSource):
@@ -165,18 +954,47 @@ class YahooFinanceSource(DataSource):
     def __init__(self):
         super().__init__("YahooFinance")
         self.base_url = "https://query1.finance.yahoo.com/v8/finance/chart"
+        self.quote_url = "https://query1.finance.yahoo.com/v7/finance/quote"
     
-    def fetch(self, symbol, interval="1h", start_date=None, end_date=None):
+    def fetch_quotes(self, symbols):
+        # Multi-symbol quote endpoint
+        by_yahoo_symbol = {self._get_yahoo_symbol(symbol): symbol for symbol in symbols}
+        yahoo_symbols = list(by_yahoo_symbol)
+        quotes = {}
+        
+        for i in range(0, len(yahoo_symbols), YAHOO_QUOTE_BATCH_SIZE):
+            chunk = yahoo_symbols[i:i + YAHOO_QUOTE_BATCH_SIZE]
+            data = self._make_request(self.quote_url, params={"symbols": ",".join(chunk)})
+            results = ((data or {}).get("quoteResponse") or {}).get("result") or []
+            
+            for item in results:
+                symbol = by_yahoo_symbol.get(item.get("symbol"))
+                price = item.get("regularMarketPrice")
+                if symbol is None or price is None:
+                    continue
+                quotes[symbol] = {
+                    "timestamp": datetime.fromtimestamp(item.get("regularMarketTime") or time.time()),
+                    "open": float(item.get("regularMarketOpen") or price),
+                    "high": float(item.get("regularMarketDayHigh") or price),
+                    "low": float(item.get("regularMarketDayLow") or price),
+                    "close": float(price),
+                    "volume": float(item.get("regularMarketVolume") or 0)
+                }
+        
+        return quotes
+    
+    def _build_request(self, symbol, interval, start_date, end_date):
         # Convert dates to UNIX timestamps
         if start_date:
             start_ts = int(datetime.strptime(start_date, "%Y-%m-%d").timestamp())
         else:
             start_ts = int((datetime.now() - timedelta(days=7)).timestamp())
         
+        # end_date is inclusive, so request up to the end of that day (or now, if sooner);
+        # midnight would leave a tail window starting today with period1 == period2
+        end_ts = int(datetime.now().timestamp())
         if end_date:
-            end_ts = int(datetime.strptime(end_date, "%Y-%m-%d").timestamp())
-        else:
-            end_ts = int(datetime.now().timestamp())
+            end_ts = min(end_ts, int((datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).timestamp()))
         
         # Map interval to Yahoo format
         interval_map = {
@@ -204,8 +1022,9 @@ class YahooFinanceSource(DataSource):
         }
         
         url = f"{self.base_url}/{yahoo_symbol}"
-        data = self._make_request(url, params=params)
-        
+        return {"url": url, "params": params}
+    
+    def _parse_response(self, data, symbol, interval, start_date, end_date, request):
         if not data or "chart" not in data or "result" not in data["chart"] or not data["chart"]["result"]:
             logger.warning(f"No data returned from Yahoo Finance for {symbol}")
             return None
@@ -215,20 +1034,14 @@ class YahooFinanceSource(DataSource):
         timestamps = chart_data["timestamp"]
         ohlcv = chart_data["indicators"]["quote"][0]
         
-        # Build DataFrame
+        # Build DataFrame straight from the response columns (nulls become NaN)
         df = pd.DataFrame({
-            "timestamp": [datetime.fromtimestamp(ts) for ts in timestamps],
-            "open": ohlcv["open"],
-            "high": ohlcv["high"],
-            "low": ohlcv["low"],
-            "close": ohlcv["close"],
-            "volume": ohlcv["volume"]
-        })
+            column: np.array(ohlcv[column], dtype=np.float64)
+            for column in ["open", "high", "low", "close", "volume"]
+        }, index=epoch_to_local(timestamps))
         
         # Clean data by removing rows with NaN values
         df = df.dropna(subset=['open', 'high', 'low', 'close'])
-        
-        df.set_index("timestamp", inplace=True)
         return df
     
     def _get_yahoo_symbol(self, symbol):
@@ -284,27 +1097,95 @@ class YahooFinanceSource(DataSource):
 class CoinGeckoSource(DataSource):
     """CoinGecko API source for cryptocurrency data"""
     
+    # market_chart total_volumes are rolling 24h totals at each point
+    rolling_volume = True
+    
     def __init__(self):
         super().__init__("CoinGecko")
         self.base_url = "https://api.coingecko.com/api/v3"
         self.coin_list = None
+        self.coin_list_lock = threading.Lock()
     
-    @lru_cache(maxsize=100)
     def _get_coin_id(self, symbol):
-        """Get CoinGecko's internal ID for a given crypto symbol"""
-        if not self.coin_list:
-            coin_list_url = f"{self.base_url}/coins/list"
-            response = self._make_request(coin_list_url)
-            
-            if not response:
-                logger.error("Failed to fetch CoinGecko coin list")
-                return None
-            
-            self.coin_list = {coin["symbol"].upper(): coin["id"] for coin in response}
+        """Get CoinGecko's internal ID for a given crypto symbol.
+        
+        Only a successfully fetched coin list is kept, so a failed fetch is retried
+        by the next lookup instead of disabling CoinGecko for the whole process.
+        """
+        with self.coin_list_lock:
+            if not self.coin_list:
+                coin_list_url = f"{self.base_url}/coins/list"
+                response = self._make_request(coin_list_url)
+                
+                if not response:
+                    logger.error("Failed to fetch CoinGecko coin list")
+                    # The provider failed, not the symbol: keep it out of the negative cache
+                    _provider_unavailable.set(True)
+                    return None
+                
+                self._set_coin_list(response)
         
         return self.coin_list.get(symbol.upper())
     
-    def fetch(self, symbol, interval="1h", start_date=None, end_date=None):
+    def _set_coin_list(self, response):
+        self.coin_list = {coin["symbol"].upper(): coin["id"] for coin in response}
+    
+    def fetch_quotes(self, symbols):
+        # /simple/price accepts many comma-separated coin ids
+        by_coin_id = {}
+        for symbol in symbols:
+            if symbol in CRYPTO:
+                coin_id = self._get_coin_id(symbol)
+                if coin_id:
+                    by_coin_id[coin_id] = symbol
+        
+        coin_ids = list(by_coin_id)
+        quotes = {}
+        for i in range(0, len(coin_ids), COINGECKO_BATCH_SIZE):
+            chunk = coin_ids[i:i + COINGECKO_BATCH_SIZE]
+            params = {
+                "ids": ",".join(chunk),
+                "vs_currencies": "usd",
+                "include_24hr_vol": "true",
+                "include_24hr_change": "true",
+                "include_last_updated_at": "true"
+            }
+            data = self._make_request(f"{self.base_url}/simple/price", params=params) or {}
+            
+            for coin_id, item in data.items():
+                symbol = by_coin_id.get(coin_id)
+                price = item.get("usd") if isinstance(item, dict) else None
+                if symbol is None or price is None:
+                    continue
+                # Free tier has no OHLC quote; derive the open from the 24h change
+                change = item.get("usd_24h_change") or 0
+                open_price = price / (1 + change / 100) if change > -100 else price
+                quotes[symbol] = {
+                    "timestamp": datetime.fromtimestamp(item.get("last_updated_at") or time.time()),
+                    "open": float(open_price),
+                    "high": float(max(open_price, price)),
+                    "low": float(min(open_price, price)),
+                    "close": float(price),
+                    "volume": float(item.get("usd_24h_vol") or 0)
+                }
+        
+        return quotes
+    
+    async def fetch_async(self, http, symbol, interval="1h", start_date=None, end_date=None):
+        # Load the coin list without blocking so _get_coin_id never hits the network
+        if not self.coin_list and symbol in CRYPTO:
+            async with http.lock("coingecko-coin-list"):
+                if not self.coin_list:
+                    response = await self._make_request_async(http, f"{self.base_url}/coins/list")
+                    if not response:
+                        logger.error("Failed to fetch CoinGecko coin list")
+                        _provider_unavailable.set(True)
+                        return None
+                    self._set_coin_list(response)
+        
+        return await super().fetch_async(http, symbol, interval, start_date, end_date)
+    
+    def _build_request(self, symbol, interval, start_date, end_date):
         if symbol not in CRYPTO:
             logger.info(f"CoinGecko only supports cryptocurrencies, skipping {symbol}")
             return None
@@ -314,11 +1195,13 @@ class CoinGeckoSource(DataSource):
             logger.warning(f"Could not find CoinGecko ID for {symbol}")
             return None
         
-        # Calculate days based on start/end dates
-        if start_date and end_date:
+        # market_chart always runs up to now, so count the days back from now to the start;
+        # below 2 days CoinGecko switches to 5-minute points, so hourly requests ask for at least 2
+        if start_date:
             start_dt = datetime.strptime(start_date, "%Y-%m-%d")
-            end_dt = datetime.strptime(end_date, "%Y-%m-%d")
-            days = (end_dt - start_dt).days + 1
+            days = (datetime.now() - start_dt).days + 1
+            if interval in ["1h", "4h"]:
+                days = max(days, 2)
         else:
             # Default: fetch 7 days for hourly, 365 days for daily
             days = 7 if interval == "1h" else 365
@@ -335,47 +1218,34 @@ class CoinGeckoSource(DataSource):
             "days": days,
             "interval": "hourly" if interval in ["1h", "4h"] else "daily"
         }
-        
-        data = self._make_request(url, params=params)
-        
+        return {"url": url, "params": params}
+    
+    def _parse_response(self, data, symbol, interval, start_date, end_date, request):
         if not data or "prices" not in data:
             logger.warning(f"No data returned from CoinGecko for {symbol}")
             return None
         
         # CoinGecko returns data as [timestamp, value] pairs
-        prices = data["prices"]
-        market_caps = data["market_caps"]
-        volumes = data["total_volumes"]
+        prices = np.array(data["prices"], dtype=np.float64).reshape(-1, 2)
+        volumes = np.array(data["total_volumes"], dtype=np.float64).reshape(-1, 2)
         
         # Create DataFrame
+        close = prices[:, 1]
         df = pd.DataFrame({
-            "timestamp": [datetime.fromtimestamp(p[0]/1000) for p in prices],
-            "close": [p[1] for p in prices],
-            "volume": [v[1] for v in volumes]
-        })
+            "close": close,
+            "volume": volumes[:, 1]
+        }, index=epoch_to_local(prices[:, 0].astype(np.int64), unit="ms"))
         
         # CoinGecko doesn't provide OHLC directly for free tier
-        # We'll use close price as an approximation for open/high/low
-        df["open"] = df["close"].shift(1)
-        df["high"] = df["close"]
-        df["low"] = df["close"]
-        
-        # Fill NaN in first row's open with first close
-        if not df.empty:
-            df.loc[df.index[0], "open"] = df.loc[df.index[0], "close"]
-        
-        df.set_index("timestamp", inplace=True)
+        # We'll use close price as an approximation for open/high/low,
+        # with the first row's open taken from its own close
+        df["open"] = np.concatenate([close[:1], close[:-1]])
+        df["high"] = close
+        df["low"] = close
         
         # If we need 4h data, resample from hourly
         if interval == "4h":
-            df = df.resample('4H').agg({
-                'open': 'first',
-                'high': 'max',
-                'low': 'min',
-                'close': 'last',
-                'volume': 'sum'
-            })
-            df = df.dropna()
+            df = resample_ohlcv(df, "4h", volume="last")
         
         return df
 
@@ -387,7 +1257,7 @@ class AlphaVantageSource(DataSource):
         self.base_url = "https://www.alphavantage.co/query"
         self.api_key = api_key
     
-    def fetch(self, symbol, interval="1h", start_date=None, end_date=None):
+    def _build_request(self, symbol, interval, start_date, end_date):
         # Skip if no API key provided
         if not self.api_key or self.api_key == "demo":
             logger.warning("No Alpha Vantage API key provided, skipping")
@@ -420,7 +1290,7 @@ class AlphaVantageSource(DataSource):
             "function": function,
             "symbol": av_symbol,
             "apikey": self.api_key,
-            "outputsize": "full"
+            "outputsize": self._get_output_size(interval, start_date)
         }
         
         # Add interval parameter for intraday data
@@ -430,7 +1300,11 @@ class AlphaVantageSource(DataSource):
         # Add datatype parameter
         params["datatype"] = "json"
         
-        data = self._make_request(self.base_url, params=params)
+        return {"url": self.base_url, "params": params, "function": function, "av_interval": av_interval}
+    
+    def _parse_response(self, data, symbol, interval, start_date, end_date, request):
+        function = request["function"]
+        av_interval = request["av_interval"]
         
         if not data:
             logger.warning(f"No data returned from Alpha Vantage for {symbol}")
@@ -462,60 +1336,57 @@ class AlphaVantageSource(DataSource):
         
         time_series = data[time_series_key]
         
-        # Create DataFrame
-        records = []
-        for date_str, values in time_series.items():
-            timestamp = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S" if ":" in date_str else "%Y-%m-%d")
-            
-            # Skip if outside requested date range
-            if start_date and timestamp.date() < datetime.strptime(start_date, "%Y-%m-%d").date():
-                continue
-            if end_date and timestamp.date() > datetime.strptime(end_date, "%Y-%m-%d").date():
-                continue
-            
-            # Handle different JSON structures
-            if function == "DIGITAL_CURRENCY_DAILY":
-                record = {
-                    "timestamp": timestamp,
-                    "open": float(values[f"1a. open (USD)"]),
-                    "high": float(values[f"2a. high (USD)"]),
-                    "low": float(values[f"3a. low (USD)"]),
-                    "close": float(values[f"4a. close (USD)"]),
-                    "volume": float(values["5. volume"])
-                }
-            else:
-                record = {
-                    "timestamp": timestamp,
-                    "open": float(values["1. open"]),
-                    "high": float(values["2. high"]),
-                    "low": float(values["3. low"]),
-                    "close": float(values["4. close"]),
-                    "volume": float(values.get("5. volume", 0))
-                }
-            
-            records.append(record)
+        # Handle different JSON structures
+        if function == "DIGITAL_CURRENCY_DAILY":
+            fields = {"open": "1a. open (USD)", "high": "2a. high (USD)", "low": "3a. low (USD)",
+                      "close": "4a. close (USD)", "volume": "5. volume"}
+        else:
+            fields = {"open": "1. open", "high": "2. high", "low": "3. low",
+                      "close": "4. close", "volume": "5. volume"}
+        
+        # Create DataFrame column by column from the {date: {field: value}} mapping
+        bars = list(time_series.values())
+        columns = {column: np.array([bar[key] for bar in bars], dtype=np.float64)
+                   for column, key in fields.items() if column != "volume"}
+        if function == "DIGITAL_CURRENCY_DAILY":
+            columns["volume"] = np.array([bar[fields["volume"]] for bar in bars], dtype=np.float64)
+        else:
+            columns["volume"] = np.array([bar.get(fields["volume"], 0) for bar in bars], dtype=np.float64)
+        df = pd.DataFrame(columns, index=parse_iso_index(list(time_series)))
+        
+        # Keep only bars inside the requested date range
+        mask = np.ones(len(df), dtype=bool)
+        if start_date:
+            mask &= df.index >= pd.Timestamp(start_date)
+        if end_date:
+            mask &= df.index < pd.Timestamp(end_date) + pd.Timedelta(days=1)
+        df = df[mask]
         
-        if not records:
+        if df.empty:
             logger.warning(f"No data found in date range for {symbol}")
             return None
         
-        df = pd.DataFrame(records)
-        df.set_index("timestamp", inplace=True)
         df.sort_index(inplace=True)
         
         # If we need 4h data and have 1h data, resample
         if interval == "4h" and function == "TIME_SERIES_INTRADAY" and av_interval == "60min":
-            df = df.resample('4H').agg({
-                'open': 'first',
-                'high': 'max',
-                'low': 'min',
-                'close': 'last',
-                'volume': 'sum'
-            })
-            df = df.dropna()
+            df = resample_ohlcv(df, "4h")
+        
+        # Single currencies are fetched as USD/XXX; store them as USD per XXX like every other source
+        if symbol in FIAT and symbol != "USD":
+            df = invert_ohlc(df)
         
         return df
     
+    def _get_output_size(self, interval, start_date):
+        """Use compact output (latest 100 points) when it covers the requested range"""
+        if not start_date:
+            return "full"
+        days = (datetime.now() - datetime.strptime(start_date, "%Y-%m-%d")).days + 1
+        # 4h is fetched as 60min bars and resampled
+        bars_per_day = BARS_PER_DAY.get("1h" if interval == "4h" else interval, 24)
+        return "compact" if days * bars_per_day <= 100 else "full"
+    
     def _get_function_for_symbol(self, symbol, interval):
         """Determine the appropriate Alpha Vantage API function for the symbol"""
         is_intraday = interval in ["1m", "5m", "15m", "30m", "1h", "4h"]
@@ -553,12 +1424,113 @@ class AlphaVantageSource(DataSource):
 class TwelveDataSource(DataSource):
     """Twelve Data API source"""
     
+    supports_batch_series = True
+    
     def __init__(self, api_key):
         super().__init__("TwelveData")
         self.base_url = "https://api.twelvedata.com"
         self.api_key = api_key
     
-    def fetch(self, symbol, interval="1h", start_date=None, end_date=None):
+    def fetch_quotes(self, symbols):
+        if not self.api_key:
+            return {}
+        
+        # /quote accepts comma-separated symbols, one credit each
+        by_td_symbol = {self._get_td_symbol(symbol): symbol for symbol in symbols}
+        td_symbols = list(by_td_symbol)
+        quotes = {}
+        
+        for i in range(0, len(td_symbols), TWELVEDATA_BATCH_SIZE):
+            chunk = td_symbols[i:i + TWELVEDATA_BATCH_SIZE]
+            params = {"symbol": ",".join(chunk), "apikey": self.api_key}
+            data = self._make_request(f"{self.base_url}/quote", params=params, cost=len(chunk))
+            if not data:
+                continue
+            
+            # A single symbol comes back unwrapped
+            if len(chunk) == 1:
+                data = {chunk[0]: data}
+            
+            for td_symbol, item in data.items():
+                symbol = by_td_symbol.get(td_symbol)
+                if symbol is None or not isinstance(item, dict) or item.get("status") == "error" or "close" not in item:
+                    continue
+                if item.get("timestamp"):
+                    timestamp = datetime.fromtimestamp(int(item["timestamp"]))
+                else:
+                    timestamp = datetime.strptime(item["datetime"], "%Y-%m-%d %H:%M:%S" if ":" in item["datetime"] else "%Y-%m-%d")
+                quotes[symbol] = {
+                    "timestamp": timestamp,
+                    "open": float(item["open"]),
+                    "high": float(item["high"]),
+                    "low": float(item["low"]),
+                    "close": float(item["close"]),
+                    "volume": float(item.get("volume") or 0)
+                }
+                if symbol in FIAT and symbol != "USD":
+                    quotes[symbol] = invert_ohlc(quotes[symbol])
+        
+        return quotes
+    
+    def fetch_many(self, symbols, interval="1h", start_date=None, end_date=None):
+        # /time_series accepts comma-separated symbols, one credit each
+        frames = {}
+        for chunk in self._batch_chunks(symbols):
+            request = self._build_batch_request(chunk, interval, start_date, end_date)
+            if request is None:
+                break
+            data = self._make_request(request["url"], params=request["params"], cost=len(chunk))
+            frames.update(self._parse_batch_response(data, chunk, interval, start_date, end_date, request))
+        return frames
+    
+    async def fetch_many_async(self, http, symbols, interval="1h", start_date=None, end_date=None):
+        async def fetch_chunk(chunk):
+            request = self._build_batch_request(chunk, interval, start_date, end_date)
+            if request is None:
+                return {}
+            data = await self._make_request_async(http, request["url"], params=request["params"], cost=len(chunk))
+            return self._parse_batch_response(data, chunk, interval, start_date, end_date, request)
+        
+        frames = {}
+        for result in await asyncio.gather(*(fetch_chunk(chunk) for chunk in self._batch_chunks(symbols))):
+            frames.update(result)
+        return frames
+    
+    def _batch_chunks(self, symbols):
+        """Split symbols into chunks that fit the per-minute credit budget"""
+        return [symbols[i:i + TWELVEDATA_BATCH_SIZE] for i in range(0, len(symbols), TWELVEDATA_BATCH_SIZE)]
+    
+    def _build_batch_request(self, symbols, interval, start_date, end_date):
+        request = self._build_request(symbols[0], interval, start_date, end_date)
+        if request is None:
+            return None
+        request["symbols"] = {self._get_td_symbol(symbol): symbol for symbol in symbols}
+        request["params"]["symbol"] = ",".join(request["symbols"])
+        return request
+    
+    def _parse_batch_response(self, data, symbols, interval, start_date, end_date, request):
+        """Split a multi-symbol time series response into per-symbol DataFrames.
+        
+        Symbols the response answered without data map to None; a failed request
+        returns {} so none of its symbols count as answered.
+        """
+        if not data:
+            return {}
+        
+        # A single symbol comes back unwrapped
+        if len(request["symbols"]) == 1:
+            data = {next(iter(request["symbols"])): data}
+        
+        frames = {}
+        for td_symbol, symbol in request["symbols"].items():
+            entry = data.get(td_symbol)
+            if not isinstance(entry, dict) or entry.get("status") == "error":
+                frames[symbol] = None
+                continue
+            frames[symbol] = self._parse_response(entry, symbol, interval, start_date, end_date, request)
+        return frames
+    
+    def _build_request(self, symbol, interval, start_date, end_date):
         # Skip if no API key provided
         if not self.api_key:
             logger.warning("No Twelve Data API key provided, skipping")
@@ -586,13 +1558,7 @@ class TwelveDataSource(DataSource):
             days = (end_dt - start_dt).days + 1
             
             # Approximate number of bars needed based on interval
-            bars_per_day = {
-                "1min": 1440, "5min": 288, "15min": 96, "30min": 48,
-                "1h": 24, "4h": 6, "1day": 1
-            }
-            
-            bars_per_day_value = bars_per_day.get(td_interval, 24)
-            output_size = days * bars_per_day_value
+            output_size = days * BARS_PER_DAY.get(interval, 24)
             
             # Cap to avoid exceeding limits
             output_size = min(output_size, 5000)
@@ -612,37 +1578,32 @@ class TwelveDataSource(DataSource):
             "apikey": self.api_key
         }
         
-        # Add date range parameters if provided
+        # Add date range parameters if provided; end_date is exclusive for Twelve Data, so a
+        # window ending today is left open (up to now) instead of ending at midnight
         if start_date:
             params["start_date"] = start_date
-        if end_date:
+        if end_date and end_date < datetime.now().strftime("%Y-%m-%d"):
             params["end_date"] = end_date
         
-        data = self._make_request(url, params=params)
-        
+        return {"url": url, "params": params}
+    
+    def _parse_response(self, data, symbol, interval, start_date, end_date, request):
         if not data or "values" not in data or not data["values"]:
             logger.warning(f"No data returned from Twelve Data for {symbol}")
             return None
         
-        # Parse the response
-        records = []
-        for bar in data["values"]:
-            records.append({
-                "timestamp": datetime.strptime(bar["datetime"], "%Y-%m-%d %H:%M:%S" if ":" in bar["datetime"] else "%Y-%m-%d"),
-                "open": float(bar["open"]),
-                "high": float(bar["high"]),
-                "low": float(bar["low"]),
-                "close": float(bar["close"]),
-                "volume": float(bar.get("volume", 0))
-            })
-        
-        if not records:
-            return None
+        # Parse the response into columns
+        bars = data["values"]
+        columns = {column: np.array([bar[column] for bar in bars], dtype=np.float64)
+                   for column in ["open", "high", "low", "close"]}
+        columns["volume"] = np.array([bar.get("volume", 0) for bar in bars], dtype=np.float64)
+        df = pd.DataFrame(columns, index=parse_iso_index([bar["datetime"] for bar in bars]))
         
-        df = pd.DataFrame(records)
-        df.set_index("timestamp", inplace=True)
         df.sort_index(inplace=True)
         
+        # Single currencies are fetched as USD/XXX; store them as USD per XXX like every other source
+        if symbol in FIAT and symbol != "USD":
+            df = invert_ohlc(df)
         return df
     
     def _get_td_symbol(self, symbol):
@@ -674,39 +1635,243 @@ class TwelveDataSource(DataSource):
         # Default case
         return symbol
 
-# ----- Cache and Data Management Functions -----
-def ensure_dirs():
-    """Ensure cache and output directories exist"""
-    Path(CACHE_DIR).mkdir(parents=True, exist_ok=True)
-    Path(OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
-    Path(PUBLIC_CHART_DATA).mkdir(parents=True, exist_ok=True)
+# Shared source instances, reused by every symbol and worker thread
+_SOURCE_FACTORIES = {
+    "YahooFinance": YahooFinanceSource,
+    "CoinGecko": CoinGeckoSource,
+    "AlphaVantage": lambda: AlphaVantageSource(ALPHA_VANTAGE_API_KEY),
+    "TwelveData": lambda: TwelveDataSource(TWELVEDATA_API_KEY)
+}
+_sources = {}
+_sources_lock = threading.Lock()
 
-def get_cache_path(symbol, interval):
-    """Get file path for cached data"""
-    return os.path.join(CACHE_DIR, f"{symbol}_{interval}.json")
+def get_data_source(name):
+    """Get the shared instance of a data source by name"""
+    with _sources_lock:
+        source = _sources.get(name)
+        if source is None:
+            source = _SOURCE_FACTORIES[name]()
+            _sources[name] = source
+        return source
 
-def is_cache_valid(symbol, interval):
-    """Check if cached data is still valid"""
-    cache_path = get_cache_path(symbol, interval)
-    if not os.path.exists(cache_path):
-        return False
-    
-    # Get file modification time
-    mod_time = os.path.getmtime(cache_path)
-    age = time.time() - mod_time
-    
-    # Check if cache is still valid
-    ttl = DEFAULT_CACHE_TTL.get(interval, DEFAULT_CACHE_TTL["1h"])
-    return age < ttl
+def get_source_names(symbol, interval):
+    """Get the configured provider order for a symbol and interval"""
+    # Prioritize sources based on asset type and interval
+    if symbol in FOREX_PAIRS:
+        # For forex, prioritize sources depending on interval
+        if interval in ["1m", "5m", "15m", "30m"]:
+            # For short timeframes, use Twelve Data and Alpha Vantage
+            # (Yahoo has limited intraday data)
+            names = ["TwelveData", "AlphaVantage", "YahooFinance"]
+        else:
+            # For longer timeframes, Yahoo is reliable
+            names = ["YahooFinance", "TwelveData", "AlphaVantage"]
+    elif symbol in CRYPTO:
+        names = ["CoinGecko", "YahooFinance", "AlphaVantage", "TwelveData"]
+    elif symbol in FIAT or symbol in METALS:
+        names = ["YahooFinance", "AlphaVantage", "TwelveData"]
+    else:  # Stocks, ETFs, commodities, indices
+        names = ["YahooFinance", "TwelveData", "AlphaVantage"]
+    return names
 
-def load_from_cache(symbol, interval):
-    """Load data from cache if available"""
-    if not is_cache_valid(symbol, interval):
-        return None
+def get_source_chain(symbol, interval):
+    """Get the ordered list of data sources to try for a symbol and interval"""
+    # Providers with open circuits are skipped and degraded ones tried last;
+    # the provider that last served this series goes first
+    sources = [get_data_source(name) for name in get_source_names(symbol, interval)]
+    return route_chain(symbol, interval, order_by_health(sources))
+
+class RoutingTable:
+    """Provider that last returned data for each (symbol, interval), with its latency and bar count"""
+    
+    def __init__(self, path):
+        self.path = path
+        self.routes = None
+        self.lock = threading.Lock()
+    
+    def _load(self):
+        if self.routes is not None:
+            return
+        try:
+            with open(self.path, "r") as f:
+                self.routes = json.load(f)
+        except FileNotFoundError:
+            self.routes = {}
+        except Exception as e:
+            logger.error(f"Error loading routing table: {e}")
+            self.routes = {}
+    
+    def get(self, symbol, interval):
+        """Get the route entry of a series, or None if no provider has served it yet"""
+        with self.lock:
+            self._load()
+            return self.routes.get(f"{symbol}|{interval}")
+    
+    def record(self, symbol, interval, source_name, latency, bars):
+        """Record the provider that just returned data for a series and persist the table.
+        
+        A route that was due for exploration, or that moved to another provider,
+        has just had its full chain walked, so its exploration clock restarts.
+        """
+        now = time.time()
+        with self.lock:
+            self._load()
+            key = f"{symbol}|{interval}"
+            previous = self.routes.get(key)
+            explored_at = now
+            if previous is not None and previous["source"] == source_name and \
+               now - previous["explored_at"] < ROUTING_EXPLORE_SECONDS:
+                explored_at = previous["explored_at"]
+            self.routes[key] = {
+                "source": source_name,
+                "latency": round(latency, 3),
+                "bars": bars,
+                "updated_at": now,
+                "explored_at": explored_at
+            }
+            atomic_write(self.path, json.dumps(self.routes, separators=(",", ":")))
+
+_routes = RoutingTable(ROUTING_TABLE_PATH)
+
+def route_chain(symbol, interval, sources):
+    """Move the provider that last served a series to the front of its chain, unless exploration is due"""
+    route = _routes.get(symbol, interval)
+    if route is None or time.time() - route["explored_at"] >= ROUTING_EXPLORE_SECONDS:
+        return sources
+    return sorted(sources, key=lambda source: source.name != route["source"])
+
+class NegativeCache:
+    """Failed (symbol, interval, provider) lookups, each suppressed for an exponentially growing TTL"""
+    
+    def __init__(self, path):
+        self.path = path
+        self.entries = None
+        self.lock = threading.Lock()
     
+    def _load(self):
+        if self.entries is not None:
+            return
+        try:
+            with open(self.path, "r") as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            self.entries = {}
+        except Exception as e:
+            logger.error(f"Error loading negative cache: {e}")
+            self.entries = {}
+    
+    def _save(self):
+        atomic_write(self.path, json.dumps(self.entries, separators=(",", ":")))
+    
+    def retry_at(self, symbol, interval, provider):
+        """Get the time before which a lookup is suppressed, or None if it is not"""
+        with self.lock:
+            self._load()
+            entry = self.entries.get(f"{symbol}|{interval}|{provider}")
+        if entry is None or time.time() >= entry["retry_at"]:
+            return None
+        return entry["retry_at"]
+    
+    def record_failure(self, symbol, interval, provider):
+        """Suppress a lookup that returned no data, for twice as long as after its previous failure"""
+        now = time.time()
+        with self.lock:
+            self._load()
+            key = f"{symbol}|{interval}|{provider}"
+            entry = self.entries.get(key) or {"failures": 0, "first_failed": now}
+            entry["failures"] += 1
+            entry["last_failed"] = now
+            ttl = min(NEGATIVE_CACHE_BASE_TTL * 2 ** (entry["failures"] - 1), NEGATIVE_CACHE_MAX_TTL)
+            entry["retry_at"] = now + ttl
+            self.entries[key] = entry
+            self._save()
+        logger.info(f"Suppressing {provider} lookups for {symbol} ({interval}) for {ttl / 3600:.1f}h "
+                    f"after {entry['failures']} failures")
+    
+    def record_success(self, symbol, interval, provider):
+        with self.lock:
+            self._load()
+            if self.entries.pop(f"{symbol}|{interval}|{provider}", None) is not None:
+                self._save()
+    
+    def failures(self):
+        """Get {(symbol, interval): {provider: failures}} for every recorded lookup"""
+        with self.lock:
+            self._load()
+            entries = dict(self.entries)
+        failures = {}
+        for key, entry in entries.items():
+            symbol, interval, provider = key.rsplit("|", 2)
+            failures.setdefault((symbol, interval), {})[provider] = entry["failures"]
+        return failures
+
+_negative_cache = NegativeCache(NEGATIVE_CACHE_PATH)
+
+def filter_negative_cached(symbol, interval, sources):
+    """Drop the providers whose lookup of a series is currently suppressed"""
+    return [source for source in sources if _negative_cache.retry_at(symbol, interval, source.name) is None]
+
+def is_negative_cached(symbol, interval):
+    """Check whether a series is currently suppressed on every provider in its chain"""
+    return all(_negative_cache.retry_at(symbol, interval, name) is not None
+               for name in get_source_names(symbol, interval))
+
+def record_lookup_failure(symbol, interval, source, unavailable):
+    """Negative-cache a failed lookup, unless the provider itself was unavailable"""
+    if not unavailable:
+        _negative_cache.record_failure(symbol, interval, source.name)
+
+def get_dead_symbols():
+    """Get the (symbol, interval) series that keep failing on every provider in their chain"""
+    dead = []
+    for (symbol, interval), failures in sorted(_negative_cache.failures().items()):
+        if all(failures.get(name, 0) >= NEGATIVE_CACHE_DEAD_FAILURES for name in get_source_names(symbol, interval)):
+            dead.append((symbol, interval))
+    return dead
+
+def report_dead_symbols():
+    """Write the permanently failing series to data/dead_symbols.json and log them"""
+    dead = get_dead_symbols()
     try:
-        cache_path = get_cache_path(symbol, interval)
-        with open(cache_path, "r") as f:
+        report = [{"symbol": symbol, "interval": interval} for symbol, interval in dead]
+        _file_writer.write(DEAD_SYMBOLS_PATH, json.dumps(report, indent=2))
+    except Exception as e:
+        logger.error(f"Error writing dead symbol report: {e}")
+    if dead:
+        logger.warning(f"{len(dead)} series fail on every provider: "
+                       f"{', '.join(f'{symbol} ({interval})' for symbol, interval in dead)}")
+    return dead
+
+# ----- Cache Backends -----
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+class CacheBackend:
+    """Base class for cache file formats"""
+    
+    extension = None
+    
+    def load(self, path):
+        """Load a cached series as a DataFrame indexed by timestamp"""
+        raise NotImplementedError("Subclasses must implement this method")
+    
+    def dumps(self, symbol, interval, df):
+        """Serialize a series to the bytes of a cache file"""
+        raise NotImplementedError("Subclasses must implement this method")
+    
+    def save(self, path, symbol, interval, df):
+        """Write a series to the cache file, returning False if the file already held it.
+        
+        An unchanged file is only touched, so its age still tracks the last refresh.
+        """
+        return _file_writer.write(path, self.dumps(symbol, interval, df), touch=True)
+
+class JsonCacheBackend(CacheBackend):
+    """Legacy format: indented JSON records with ISO timestamps"""
+    
+    extension = "json"
+    
+    def load(self, path):
+        with open(path, "r") as f:
             data = json.load(f)
         
         # Convert to DataFrame
@@ -715,18 +1880,10 @@ def load_from_cache(symbol, interval):
             df["timestamp"] = pd.to_datetime(df["timestamp"])
             df.set_index("timestamp", inplace=True)
         return df
-    except Exception as e:
-        logger.error(f"Error loading cache for {symbol}_{interval}: {e}")
-        return None
-
-def save_to_cache(symbol, interval, df):
-    """Save data to cache"""
-    if df is None or df.empty:
-        return
     
-    try:
+    def dumps(self, symbol, interval, df):
         # Reset index to include timestamp as column
-        df_reset = df.reset_index()
+        df_reset = df.rename_axis("timestamp").reset_index()
         
         # Convert to dict for JSON serialization
         data = {
@@ -735,10 +1892,578 @@ def save_to_cache(symbol, interval, df):
             "last_updated": datetime.now().isoformat(),
             "data": df_reset.to_dict(orient="records")
         }
+        return json.dumps(data, indent=2, default=str).encode()
+
+class NpzCacheBackend(CacheBackend):
+    """Columnar NumPy archive: int64 epoch-nanosecond timestamps and float64 OHLCV"""
+    
+    extension = "npz"
+    compression = zipfile.ZIP_STORED
+    
+    def load(self, path):
+        with np.load(path) as data:
+            index = pd.DatetimeIndex(data["timestamp"].view("datetime64[ns]"), name="timestamp")
+            columns = {column: data[column] for column in OHLCV_COLUMNS if column in data.files}
+        return pd.DataFrame(columns, index=index)
+    
+    def dumps(self, symbol, interval, df):
+        # Same layout as np.savez, but with fixed member dates so equal data gives equal bytes
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", self.compression) as archive:
+            for name, values in frame_to_arrays(df).items():
+                info = zipfile.ZipInfo(f"{name}.npy", date_time=(1980, 1, 1, 0, 0, 0))
+                info.compress_type = self.compression
+                with archive.open(info, "w") as f:
+                    np.lib.format.write_array(f, np.ascontiguousarray(values), allow_pickle=False)
+        return buffer.getvalue()
+
+class CompressedNpzBackend(NpzCacheBackend):
+    """Npz with deflated members (the np.savez_compressed layout), used by the output archive"""
+    
+    compression = zipfile.ZIP_DEFLATED
+
+class ParquetCacheBackend(CacheBackend):
+    """Columnar Parquet file via pyarrow"""
+    
+    extension = "parquet"
+    
+    def load(self, path):
+        return pd.read_parquet(path)
+    
+    def dumps(self, symbol, interval, df):
+        df = df.rename_axis("timestamp")[[column for column in OHLCV_COLUMNS if column in df.columns]]
+        buffer = io.BytesIO()
+        df.to_parquet(buffer)
+        return buffer.getvalue()
+
+def frame_to_arrays(df):
+    """Split an OHLCV frame into an int64 epoch-ns timestamp array and float64 columns"""
+    arrays = {"timestamp": df.index.values.astype("datetime64[ns]").view("int64")}
+    for column in OHLCV_COLUMNS:
+        if column in df.columns:
+            arrays[column] = df[column].to_numpy(dtype="float64", na_value=np.nan)
+        elif column == "volume":
+            arrays[column] = np.zeros(len(df))
+    return arrays
+
+_cache_backend = None
+
+def get_cache_backend():
+    """Get the cache backend selected by CACHE_FORMAT"""
+    global _cache_backend
+    if _cache_backend is None:
+        backends = {
+            "json": JsonCacheBackend,
+            "npz": NpzCacheBackend,
+            "parquet": ParquetCacheBackend
+        }
+        cache_format = CACHE_FORMAT
+        if cache_format == "parquet" and not has_pyarrow():
+            logger.warning("pyarrow is not installed, using the npz cache format instead of parquet")
+            cache_format = "npz"
+        _cache_backend = backends.get(cache_format, NpzCacheBackend)()
+    return _cache_backend
+
+def has_pyarrow():
+    """Check whether pyarrow is available for Parquet files"""
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def migrate_legacy_cache(symbol, interval):
+    """Convert a legacy JSON cache entry to the configured format. Returns True if migrated."""
+    backend = get_cache_backend()
+    legacy_path = os.path.join(CACHE_DIR, f"{symbol}_{interval}.json")
+    if backend.extension == "json" or not os.path.exists(legacy_path):
+        return False
+    
+    try:
+        df = JsonCacheBackend().load(legacy_path)
+        if df is None or df.empty:
+            raise ValueError("no rows")
+    except (ValueError, KeyError, TypeError) as e:
+        # Unreadable legacy files (e.g. truncated writes) only cost a refetch
+        logger.warning(f"Discarding unreadable legacy cache for {symbol}_{interval}: {e}")
+        os.remove(legacy_path)
+        return False
+    except OSError as e:
+        logger.error(f"Could not read legacy cache for {symbol}_{interval}: {e}")
+        return False
+    
+    cache_path = get_cache_path(symbol, interval)
+    try:
+        backend.save(cache_path, symbol, interval, df)
+        
+        # Keep the original age so the TTL still applies to the migrated data
+        mod_time = os.path.getmtime(legacy_path)
+        os.utime(cache_path, (mod_time, mod_time))
+    except Exception as e:
+        # The legacy file stays the only copy until a migration succeeds
+        logger.error(f"Could not migrate cache for {symbol}_{interval}, keeping the legacy file: {e}")
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+        return False
+    
+    os.remove(legacy_path)
+    logger.info(f"Migrated cache for {symbol}_{interval} to {backend.extension}")
+    return True
+
+class FrameCache:
+    """Thread-safe LRU of decoded cache frames keyed by (symbol, interval).
+    
+    Entries are tagged with the cache file's mtime, so a file changed on disk is
+    reloaded. Frames are shared between callers and must be treated as read-only.
+    """
+    
+    def __init__(self, max_entries=FRAME_CACHE_MAX_ENTRIES, max_bytes=FRAME_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (mtime_ns, size, df)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+    
+    def get(self, key, mtime_ns):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == mtime_ns:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+    
+    def put(self, key, mtime_ns, df):
+        size = int(df.memory_usage(index=True).sum())
+        if size > self.max_bytes:
+            return
+        
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (mtime_ns, size, df)
+            self.bytes += size
+            
+            # Evict least recently used frames until both limits hold
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                oldest = next(iter(self.entries))
+                self._remove(oldest)
+                self.evictions += 1
+    
+    def invalidate(self, key):
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+    
+    def _remove(self, key):
+        _, size, _ = self.entries.pop(key)
+        self.bytes -= size
+    
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+_frame_cache = FrameCache()
+
+def get_frame_cache_stats():
+    """Get hit/miss/eviction counters and size of the in-memory frame cache"""
+    return _frame_cache.stats()
+
+def log_frame_cache_stats():
+    stats = get_frame_cache_stats()
+    logger.info(f"Frame cache: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions, "
+                f"{stats['entries']} entries ({stats['bytes'] / (1024 * 1024):.1f} MB)")
+
+class LatestBarIndex:
+    """Last OHLCV bar and save time of every cached (symbol, interval), kept in one compact file"""
+    
+    def __init__(self, path):
+        self.path = path
+        self.bars = None
+        self.lock = threading.Lock()
+    
+    def _load(self):
+        if self.bars is not None:
+            return
+        try:
+            with open(self.path, "r") as f:
+                self.bars = json.load(f)
+        except FileNotFoundError:
+            self.bars = {}
+        except Exception as e:
+            logger.error(f"Error loading latest bar index: {e}")
+            self.bars = {}
+    
+    def get(self, symbol, interval):
+        """Get the latest bar entry, or None if the series has not been indexed"""
+        with self.lock:
+            self._load()
+            return self.bars.get(f"{symbol}|{interval}")
+    
+    def update(self, symbol, interval, df, saved_at=None):
+        """Record the last bar of a series and persist the index atomically"""
+        latest = df.iloc[-1]
+        entry = {
+            "timestamp": latest.name.isoformat(),
+            "open": float(latest["open"]),
+            "high": float(latest["high"]),
+            "low": float(latest["low"]),
+            "close": float(latest["close"]),
+            "volume": float(latest["volume"]) if "volume" in latest else 0,
+            "saved_at": saved_at if saved_at is not None else time.time()
+        }
+        with self.lock:
+            self._load()
+            self.bars[f"{symbol}|{interval}"] = entry
+            atomic_write(self.path, json.dumps(self.bars, separators=(",", ":")))
+
+_latest_bars = LatestBarIndex(LATEST_BARS_PATH)
+
+def get_latest_bar(symbol, interval="1d", allow_stale=False):
+    """Get the last cached bar of a series in O(1), or None if missing or expired.
+    
+    Series cached before the index existed are indexed on first lookup.
+    """
+    bar = _latest_bars.get(symbol, interval)
+    if bar is None:
+        df = load_from_cache(symbol, interval, allow_stale=True)
+        if df is None or df.empty:
+            return None
+        mod_time = os.path.getmtime(get_cache_path(symbol, interval))
+        _latest_bars.update(symbol, interval, df, saved_at=mod_time)
+        bar = _latest_bars.get(symbol, interval)
+    
+    ttl = DEFAULT_CACHE_TTL.get(interval, DEFAULT_CACHE_TTL["1h"])
+    if not allow_stale and time.time() - bar["saved_at"] >= ttl:
+        return None
+    return bar
+
+def atomic_write(path, data):
+    """Write a file via a temporary file and os.replace so readers never see partial content"""
+    mode = "wb" if isinstance(data, bytes) else "w"
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, mode) as f:
+            f.write(data)
+        # mkstemp creates owner-only files; keep the outputs readable like a normal write
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+class ChangeDetectingWriter:
+    """Atomic file writer that skips writes whose content is already on disk.
+    
+    Payloads are compared by BLAKE2 digest. Digests of files this process wrote
+    are remembered with their size and mtime, so unchanged files are not re-read.
+    """
+    
+    def __init__(self):
+        self.digests = {}  # path -> (size, mtime_ns, digest)
+        self.files_written = 0
+        self.files_skipped = 0
+        self.bytes_written = 0
+        self.bytes_skipped = 0
+        self.lock = threading.Lock()
+    
+    def _disk_digest(self, path, size):
+        """Digest of the file currently at path, or None if it cannot match a payload of this size"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        if stat.st_size != size:
+            return None
         
+        with self.lock:
+            known = self.digests.get(path)
+        if known is not None and known[:2] == (stat.st_size, stat.st_mtime_ns):
+            return known[2]
+        with open(path, "rb") as f:
+            return hashlib.blake2b(f.read(), digest_size=16).digest()
+    
+    def _remember(self, path, digest):
+        stat = os.stat(path)
+        with self.lock:
+            self.digests[path] = (stat.st_size, stat.st_mtime_ns, digest)
+    
+    def write(self, path, data, touch=False):
+        """Write data (str or bytes) to path unless identical. Returns True if the file was written.
+        
+        With touch, a skipped file still gets its mtime bumped (used for cache TTLs).
+        """
+        payload = data.encode() if isinstance(data, str) else data
+        digest = hashlib.blake2b(payload, digest_size=16).digest()
+        
+        if self._disk_digest(path, len(payload)) == digest:
+            if touch:
+                os.utime(path)
+            self._remember(path, digest)
+            with self.lock:
+                self.files_skipped += 1
+                self.bytes_skipped += len(payload)
+            return False
+        
+        atomic_write(path, payload)
+        self._remember(path, digest)
+        with self.lock:
+            self.files_written += 1
+            self.bytes_written += len(payload)
+        return True
+    
+    def stats(self):
+        with self.lock:
+            return {
+                "files_written": self.files_written,
+                "files_skipped": self.files_skipped,
+                "bytes_written": self.bytes_written,
+                "bytes_skipped": self.bytes_skipped
+            }
+
+_file_writer = ChangeDetectingWriter()
+
+def get_write_stats():
+    """Get counters of files and bytes written or skipped as unchanged"""
+    return _file_writer.stats()
+
+def log_write_stats():
+    stats = get_write_stats()
+    logger.info(f"File writes: {stats['files_written']} written ({stats['bytes_written'] / (1024 * 1024):.1f} MB), "
+                f"{stats['files_skipped']} unchanged and skipped ({stats['bytes_skipped'] / (1024 * 1024):.1f} MB)")
+
+# ----- Serialization -----
+RECORD_PRICE_COLUMNS = ("open", "high", "low", "close")
+
+def _ohlcv_arrays(df):
+    """OHLCV columns as arrays; a missing volume column becomes integer zeros like the old row loops"""
+    arrays = {name: df[name].to_numpy(dtype=np.float64) for name in RECORD_PRICE_COLUMNS}
+    if "volume" in df.columns:
+        arrays["volume"] = df["volume"].to_numpy(dtype=np.float64)
+    else:
+        arrays["volume"] = np.zeros(len(df), dtype=np.int64)
+    return arrays
+
+def _whole_seconds_ns(index):
+    """Return the index as int64 nanoseconds if every entry falls on a whole second, else None"""
+    if not isinstance(index, pd.DatetimeIndex) or index.hasnans:
+        return None
+    values = index.as_unit("ns").asi8
+    if (values % 1_000_000_000).any():
+        return None
+    return values
+
+def _index_isoformat(index):
+    """Timestamp.isoformat() for each index entry, in one NumPy call for naive whole-second indexes"""
+    if getattr(index, "tz", None) is None and _whole_seconds_ns(index) is not None:
+        return np.datetime_as_string(index.values, unit="s").tolist()
+    return [ts.isoformat() for ts in index]
+
+def _index_epoch_ms(index):
+    """int(Timestamp.timestamp() * 1000) for each index entry"""
+    values = _whole_seconds_ns(index)
+    if values is not None:
+        return (values // 1_000_000).tolist()
+    return [int(ts.timestamp() * 1000) for ts in index]
+
+def _orjson_compatible(arrays, strings=()):
+    """Check that orjson would produce exactly the bytes json.dumps does for these values.
+    
+    The two encoders agree on plain ASCII strings and on floats that repr() writes
+    without an exponent; NaN, infinities and very large or small magnitudes differ.
+    """
+    if orjson is None:
+        return False
+    if not all(s.isascii() and s.isprintable() for s in strings):
+        return False
+    for values in arrays:
+        magnitude = np.abs(values)
+        if not np.all((magnitude == 0) | ((magnitude >= 1e-4) & (magnitude < 1e16))):
+            return False
+    return True
+
+def serialize_output(symbol, interval, df):
+    """Build the standardized records for a frame, returning (json_text, csv_text)"""
+    arrays = _ohlcv_arrays(df)
+    columns = {
+        "symbol": [symbol] * len(df),
+        "timestamp": _index_isoformat(df.index),
+        **{name: values.tolist() for name, values in arrays.items()},
+        "interval": [interval] * len(df),
+    }
+    keys = list(columns)
+    records = [dict(zip(keys, row)) for row in zip(*columns.values())]
+    
+    if _orjson_compatible(arrays.values(), (symbol, interval)):
+        json_text = orjson.dumps(records, option=orjson.OPT_INDENT_2).decode()
+    else:
+        json_text = json.dumps(records, indent=2)
+    csv_text = pd.DataFrame(columns).to_csv(index=False)
+    return json_text, csv_text
+
+def serialize_candles(df):
+    """Build the candles JSON ([timestamp_ms, open, high, low, close, volume] rows) for a frame"""
+    arrays = _ohlcv_arrays(df)
+    columns = [_index_epoch_ms(df.index)] + [arrays[name].tolist() for name in (*RECORD_PRICE_COLUMNS, "volume")]
+    return json.dumps([list(row) for row in zip(*columns)])
+
+def records_to_candles(data):
+    """Convert saved records to candles"""
+    candles = []
+    for item in data:
+        if "timestamp" in item and "open" in item:
+            ts = datetime.fromisoformat(item["timestamp"]).timestamp() * 1000
+            candles.append([
+                int(ts),
+                float(item["open"]),
+                float(item["high"]),
+                float(item["low"]),
+                float(item["close"]),
+                float(item.get("volume", 0))
+            ])
+    return candles
+
+def benchmark_serializers(bars=10000, repeat=5):
+    """Time the vectorized serializers against the old per-row loops and check the bytes match"""
+    index = pd.date_range(end=datetime.now().replace(second=0, microsecond=0), periods=bars, freq="min")
+    close = 100 + np.cumsum(np.random.default_rng(0).normal(0, 0.1, bars))
+    df = pd.DataFrame({
+        "open": np.round(close + 0.01, 5),
+        "high": np.round(close + 0.05, 5),
+        "low": np.round(close - 0.05, 5),
+        "close": np.round(close, 5),
+        "volume": np.round(np.abs(close) * 1000, 0),
+    }, index=index)
+    
+    def legacy_output():
+        records = []
+        for idx, row in df.iterrows():
+            records.append({
+                "symbol": "BENCH",
+                "timestamp": idx.isoformat(),
+                "open": float(row["open"]),
+                "high": float(row["high"]),
+                "low": float(row["low"]),
+                "close": float(row["close"]),
+                "volume": float(row["volume"]) if "volume" in row else 0,
+                "interval": "1m"
+            })
+        return json.dumps(records, indent=2), pd.DataFrame(records).to_csv(index=False)
+    
+    def legacy_candles():
+        candles = []
+        for idx, row in df.iterrows():
+            candles.append([
+                int(idx.timestamp() * 1000),
+                float(row["open"]),
+                float(row["high"]),
+                float(row["low"]),
+                float(row["close"]),
+                float(row["volume"]) if "volume" in row else 0
+            ])
+        return json.dumps(candles)
+    
+    cases = [
+        ("save_to_output", legacy_output, lambda: serialize_output("BENCH", "1m", df)),
+        ("save_candles_format", legacy_candles, lambda: serialize_candles(df)),
+    ]
+    
+    results = {}
+    scale = 10000 / bars
+    for name, legacy, vectorized in cases:
+        timings = {}
+        for label, func in (("legacy", legacy), ("vectorized", vectorized)):
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                output = func()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            timings[label] = (best * scale, output)
+        identical = timings["legacy"][1] == timings["vectorized"][1]
+        legacy_time, vectorized_time = timings["legacy"][0], timings["vectorized"][0]
+        results[name] = {
+            "legacy_ms_per_10k": round(legacy_time * 1000, 2),
+            "vectorized_ms_per_10k": round(vectorized_time * 1000, 2),
+            "speedup": round(legacy_time / vectorized_time, 1) if vectorized_time else None,
+            "identical": identical,
+        }
+        logger.info(f"{name}: {results[name]}")
+    return results
+
+# ----- Cache and Data Management Functions -----
+def ensure_dirs():
+    """Ensure cache and output directories exist"""
+    Path(CACHE_DIR).mkdir(parents=True, exist_ok=True)
+    Path(OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
+    Path(PUBLIC_CHART_DATA).mkdir(parents=True, exist_ok=True)
+
+def get_cache_path(symbol, interval):
+    """Get file path for cached data"""
+    return os.path.join(CACHE_DIR, f"{symbol}_{interval}.{get_cache_backend().extension}")
+
+def cache_exists(symbol, interval):
+    """Check whether a cache entry exists, migrating a legacy JSON entry if needed"""
+    cache_path = get_cache_path(symbol, interval)
+    if os.path.exists(cache_path):
+        return True
+    return migrate_legacy_cache(symbol, interval)
+
+def is_cache_valid(symbol, interval):
+    """Check if cached data is still valid"""
+    if not cache_exists(symbol, interval):
+        return False
+    
+    # Get file modification time
+    mod_time = os.path.getmtime(get_cache_path(symbol, interval))
+    age = time.time() - mod_time
+    
+    # Check if cache is still valid
+    ttl = DEFAULT_CACHE_TTL.get(interval, DEFAULT_CACHE_TTL["1h"])
+    return age < ttl
+
+def load_from_cache(symbol, interval, allow_stale=False):
+    """Load data from cache if available (expired entries too when allow_stale is set)"""
+    if allow_stale:
+        if not cache_exists(symbol, interval):
+            return None
+    elif not is_cache_valid(symbol, interval):
+        return None
+    
+    try:
         cache_path = get_cache_path(symbol, interval)
-        with open(cache_path, "w") as f:
-            json.dump(data, f, indent=2)
+        mtime_ns = os.stat(cache_path).st_mtime_ns
+        df = _frame_cache.get((symbol, interval), mtime_ns)
+        if df is None:
+            df = get_cache_backend().load(cache_path)
+            _frame_cache.put((symbol, interval), mtime_ns, df)
+        return df
+    except Exception as e:
+        logger.error(f"Error loading cache for {symbol}_{interval}: {e}")
+        return None
+
+def save_to_cache(symbol, interval, df):
+    """Save data to cache"""
+    if df is None or df.empty:
+        return
+    
+    try:
+        _frame_cache.invalidate((symbol, interval))
+        get_cache_backend().save(get_cache_path(symbol, interval), symbol, interval, df)
+        _latest_bars.update(symbol, interval, df)
     except Exception as e:
         logger.error(f"Error saving cache for {symbol}_{interval}: {e}")
 
@@ -754,52 +2479,91 @@ def save_to_output(symbol, interval, df):
         Path(output_path).mkdir(parents=True, exist_ok=True)
         
         # Convert to standardized records format
-        records = []
-        for idx, row in df.iterrows():
-            record = {
-                "symbol": symbol,
-                "timestamp": idx.isoformat(),
-                "open": float(row["open"]),
-                "high": float(row["high"]),
-                "low": float(row["low"]),
-                "close": float(row["close"]),
-                "volume": float(row["volume"]) if "volume" in row else 0,
-                "interval": interval
-            }
-            records.append(record)
+        json_text, csv_text = serialize_output(symbol, interval, df)
         
-        # Save to JSON file
+        # Save to JSON file (files whose content is unchanged are left alone)
         output_file = os.path.join(output_path, f"{symbol}_{interval}.json")
-        with open(output_file, "w") as f:
-            json.dump(records, f, indent=2)
+        _file_writer.write(output_file, json_text)
         
         # Also save to public/chart-data directory
         public_chart_file = os.path.join(PUBLIC_CHART_DATA, f"{symbol}_{interval}.json")
-        with open(public_chart_file, "w") as f:
-            json.dump(records, f, indent=2)
-        
-        # Also save a consolidated CSV with most recent data
-        csv_path = os.path.join(OUTPUT_DIR, f"market_data_{interval}.csv")
+        _file_writer.write(public_chart_file, json_text)
         
-        # Check if file exists and read it
-        if os.path.exists(csv_path):
-            existing_df = pd.read_csv(csv_path)
-            # Remove data for this symbol to be replaced with new data
-            existing_df = existing_df[existing_df["symbol"] != symbol]
-        else:
-            existing_df = pd.DataFrame()
-        
-        # Prepare new data
-        new_data = pd.DataFrame(records)
-        # Append new data
-        combined_df = pd.concat([existing_df, new_data], ignore_index=True)
-        # Save to CSV
-        combined_df.to_csv(csv_path, index=False)
+        # Write this symbol's partition; merge_output_partitions builds the
+        # consolidated market_data_{interval}.csv once per batch
+        partition_path = get_output_partition_path(symbol, interval)
+        _file_writer.write(partition_path, csv_text)
         
         logger.info(f"Saved data for {symbol} ({interval}) to {output_file} and {public_chart_file}")
     except Exception as e:
         logger.error(f"Error saving output for {symbol}_{interval}: {e}")
 
+_partitions_lock = threading.Lock()
+_partitioned_intervals = set()
+
+def get_output_partition_path(symbol, interval):
+    """Get the per-symbol partition file for the consolidated CSV, creating its directory"""
+    partition_dir = os.path.join(OUTPUT_PARTITION_DIR, interval)
+    with _partitions_lock:
+        if interval not in _partitioned_intervals:
+            split_consolidated_csv(interval)
+            _partitioned_intervals.add(interval)
+    return os.path.join(partition_dir, f"{symbol}.csv")
+
+def split_consolidated_csv(interval):
+    """Seed partitions from an existing market_data_{interval}.csv so no symbols are lost"""
+    partition_dir = os.path.join(OUTPUT_PARTITION_DIR, interval)
+    csv_path = os.path.join(OUTPUT_DIR, f"market_data_{interval}.csv")
+    if os.path.isdir(partition_dir):
+        return
+    
+    Path(partition_dir).mkdir(parents=True, exist_ok=True)
+    if not os.path.exists(csv_path):
+        return
+    try:
+        existing_df = pd.read_csv(csv_path)
+        for symbol, group in existing_df.groupby("symbol", sort=False):
+            atomic_write(os.path.join(partition_dir, f"{symbol}.csv"), group.to_csv(index=False))
+        logger.info(f"Split {csv_path} into {existing_df['symbol'].nunique()} partitions")
+    except Exception as e:
+        logger.error(f"Error splitting {csv_path} into partitions: {e}")
+
+def merge_output_partitions(interval):
+    """Build market_data_{interval}.csv (and optionally .parquet) from the symbol partitions"""
+    partition_dir = os.path.join(OUTPUT_PARTITION_DIR, interval)
+    if not os.path.isdir(partition_dir):
+        return
+    
+    try:
+        files = sorted(name for name in os.listdir(partition_dir) if name.endswith(".csv"))
+        csv_path = os.path.join(OUTPUT_DIR, f"market_data_{interval}.csv")
+        
+        # Stream the partitions into one file, keeping only the first header
+        fd, tmp_path = tempfile.mkstemp(dir=OUTPUT_DIR, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w") as out:
+                header_written = False
+                for name in files:
+                    with open(os.path.join(partition_dir, name), "r") as f:
+                        header = f.readline()
+                        if not header_written:
+                            out.write(header)
+                            header_written = True
+                        shutil.copyfileobj(f, out)
+            os.replace(tmp_path, csv_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        
+        if OUTPUT_COLUMNAR and has_pyarrow():
+            parquet_path = os.path.join(OUTPUT_DIR, f"market_data_{interval}.parquet")
+            pd.read_csv(csv_path).to_parquet(parquet_path + ".tmp", index=False)
+            os.replace(parquet_path + ".tmp", parquet_path)
+        
+        logger.info(f"Merged {len(files)} partitions into {csv_path}")
+    except Exception as e:
+        logger.error(f"Error merging output partitions for {interval}: {e}")
+
 def save_candles_format(symbol, interval, df):
     """Save data in candles format (array of arrays) for charting libraries"""
     if df is None or df.empty:
@@ -810,32 +2574,24 @@ def save_candles_format(symbol, interval, df):
         Path(PUBLIC_CHART_DATA).mkdir(parents=True, exist_ok=True)
         
         # Convert to candles format: [timestamp, open, high, low, close, volume]
-        candles = []
-        for idx, row in df.iterrows():
-            # Convert timestamp to milliseconds for JS compatibility
-            ts_ms = int(idx.timestamp() * 1000)
-            candle = [
-                ts_ms,
-                float(row["open"]),
-                float(row["high"]),
-                float(row["low"]),
-                float(row["close"]),
-                float(row["volume"]) if "volume" in row else 0
-            ]
-            candles.append(candle)
+        # with timestamps in milliseconds for JS compatibility
+        candles_text = serialize_candles(df)
         
         # Save to JSON file in public/chart-data
         output_file = os.path.join(PUBLIC_CHART_DATA, f"{symbol}_{interval}_candles.json")
-        with open(output_file, "w") as f:
-            json.dump(candles, f)
+        _file_writer.write(output_file, candles_text)
         
         logger.info(f"Saved candles format for {symbol} ({interval}) to {output_file}")
     except Exception as e:
         logger.error(f"Error saving candles format for {symbol}_{interval}: {e}")
 
 # ----- Main Data Fetching Logic -----
-def fetch_data_with_fallback(symbol, interval="1h", force_refresh=False):
-    """Fetch data for the given symbol with fallback mechanisms"""
+def fetch_data_with_fallback(symbol, interval="1h", force_refresh=False, exclude=()):
+    """Fetch data for the given symbol with fallback mechanisms.
+    
+    Providers named in exclude are left out of the chain, e.g. a batch provider
+    that has just failed to return the symbol.
+    """
     # Check cache first unless force refresh
     if not force_refresh:
         cached_data = load_from_cache(symbol, interval)
@@ -843,84 +2599,216 @@ def fetch_data_with_fallback(symbol, interval="1h", force_refresh=False):
             logger.info(f"Using cached data for {symbol} ({interval})")
             return cached_data
     
-    # Calculate date range based on interval
-    end_date = datetime.now().strftime("%Y-%m-%d")
+    # Calculate date range based on interval, starting at the cached tail if there is one
+    existing = get_incremental_base(symbol, interval, force_refresh)
+    start_date, end_date = get_fetch_window(interval, existing)
     
-    # Determine lookback period based on interval
-    lookback_days = {
-        "1m": 1,
-        "5m": 3,
-        "15m": 5,
-        "30m": 5,
-        "1h": 7,
-        "4h": 30,
-        "1d": 365
-    }
-    days_lookback = lookback_days.get(interval, 7)
-    start_date = (datetime.now() - timedelta(days=days_lookback)).strftime("%Y-%m-%d")
+    if is_negative_cached(symbol, interval):
+        logger.info(f"Skipping {symbol} ({interval}): every provider recently failed to return it")
+        return None
     
-    # Initialize data sources
-    data_sources = []
+    # Shared data sources in priority order for this asset type, minus
+    # the ones that recently failed to return this series
+    data_sources = filter_negative_cached(symbol, interval, get_source_chain(symbol, interval))
+    data_sources = [source for source in data_sources if source.name not in exclude]
     
-    # Prioritize sources based on asset type and interval
-    if symbol in FOREX_PAIRS:
-        # For forex, prioritize sources depending on interval
-        if interval in ["1m", "5m", "15m", "30m"]:
-            # For short timeframes, use Twelve Data and Alpha Vantage
-            data_sources = [
-                TwelveDataSource(TWELVEDATA_API_KEY),
-                AlphaVantageSource(ALPHA_VANTAGE_API_KEY),
-                YahooFinanceSource()  # Yahoo has limited intraday data
-            ]
-        else:
-            # For longer timeframes, Yahoo is reliable
-            data_sources = [
-                YahooFinanceSource(),
-                TwelveDataSource(TWELVEDATA_API_KEY),
-                AlphaVantageSource(ALPHA_VANTAGE_API_KEY)
-            ]
-    elif symbol in CRYPTO:
-        data_sources = [
-            CoinGeckoSource(),
-            YahooFinanceSource(),
-            AlphaVantageSource(ALPHA_VANTAGE_API_KEY),
-            TwelveDataSource(TWELVEDATA_API_KEY)
-        ]
-    elif symbol in FIAT or symbol in METALS:
-        data_sources = [
-            YahooFinanceSource(),
-            AlphaVantageSource(ALPHA_VANTAGE_API_KEY),
-            TwelveDataSource(TWELVEDATA_API_KEY)
-        ]
-    else:  # Stocks, ETFs, commodities, indices
-        data_sources = [
-            YahooFinanceSource(),
-            TwelveDataSource(TWELVEDATA_API_KEY),
-            AlphaVantageSource(ALPHA_VANTAGE_API_KEY)
-        ]
+    # Try the sources until one returns data, hedging slow ones
+    source, df, latency = fetch_from_chain(symbol, interval, data_sources, start_date, end_date, tail=existing is not None)
+    if df is None:
+        logger.warning(f"Failed to fetch data for {symbol} from all sources")
+        return None
     
-    # Try each source until we get data
-    df = None
-    errors = []
+    logger.info(f"Successfully fetched data from {source.name} for {symbol}")
+    _routes.record(symbol, interval, source.name, latency, len(df))
+    _negative_cache.record_success(symbol, interval, source.name)
     
-    for source in data_sources:
-        try:
-            logger.info(f"Trying {source.name} for {symbol} ({interval})")
-            df = source.fetch(symbol, interval, start_date, end_date)
+    df = merge_series(existing, df, interval)
+    store_series(symbol, interval, df, derive=not source.rolling_volume)
+    return df
+
+_hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="hedge")
+
+def fetch_attempt(source, symbol, interval, start_date, end_date, cancel, deadline):
+    """Fetch a series from one source on a hedge worker, returning (df, latency, provider_unavailable)"""
+    _request_cancel.set(cancel)
+    _request_deadline.set(deadline)
+    _provider_unavailable.set(False)
+    started = time.monotonic()
+    try:
+        df = source.fetch(symbol, interval, start_date, end_date)
+    except Exception as e:
+        logger.error(f"Error from {source.name} for {symbol}: {str(e)}")
+        df = None
+    return df, time.monotonic() - started, _provider_unavailable.get()
+
+def get_hedge_timing(interval):
+    """Get the (latency budget or None when hedging is off, deadline) of a fetch for an interval"""
+    budget = HEDGE_LATENCY_BUDGET.get(interval, HEDGE_LATENCY_BUDGET["1h"]) if HEDGE_REQUESTS else None
+    return budget, time.monotonic() + FETCH_DEADLINE.get(interval, FETCH_DEADLINE["1h"])
+
+def fetch_from_chain(symbol, interval, data_sources, start_date, end_date, tail=False):
+    """Try a chain of sources for a series, returning (source, df, latency) or (None, None, None).
+    
+    Sources start one after another as the previous ones fail. With HEDGE_REQUESTS,
+    the next source also starts when the running ones have been silent for the
+    interval's latency budget; the first non-empty series wins and the others are
+    cancelled. Everything is abandoned at the interval's FETCH_DEADLINE.
+    
+    For a tail fetch of a cached series (tail=True) an empty reply may just mean no
+    new bars yet, so it is not negative-cached.
+    """
+    budget, deadline = get_hedge_timing(interval)
+    cancel = threading.Event()
+    remaining = list(data_sources)
+    running = {}
+    
+    def start_next():
+        source = remaining.pop(0)
+        logger.info(f"Trying {source.name} for {symbol} ({interval})")
+        future = _hedge_executor.submit(fetch_attempt, source, symbol, interval, start_date, end_date, cancel, deadline)
+        running[future] = source
+    
+    try:
+        while remaining or running:
+            if not running:
+                start_next()
             
-            if df is not None and not df.empty:
-                logger.info(f"Successfully fetched data from {source.name} for {symbol}")
+            time_left = deadline - time.monotonic()
+            if time_left <= 0:
+                logger.warning(f"Giving up on {symbol} ({interval}) after its {FETCH_DEADLINE.get(interval, FETCH_DEADLINE['1h'])}s deadline")
                 break
+            timeout = min(time_left, budget) if budget is not None and remaining else time_left
+            
+            done, _ = wait_futures(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                if remaining and timeout < time_left:
+                    logger.info(f"{', '.join(source.name for source in running.values())} slow for {symbol} ({interval}), "
+                                f"hedging with {remaining[0].name}")
+                    start_next()
+                continue
+            
+            for future in done:
+                source = running.pop(future)
+                df, latency, unavailable = future.result()
+                if df is not None and not df.empty:
+                    return source, df, latency
+                record_lookup_failure(symbol, interval, source, unavailable or tail)
             
+            # A failed source hands over to the next one straight away
+            if remaining:
+                start_next()
+        return None, None, None
+    finally:
+        # Losers stop at their next retry or backoff; those not started yet never run
+        cancel.set()
+        for future in running:
+            future.cancel()
+
+async def fetch_from_chain_async(http, symbol, interval, data_sources, start_date, end_date, tail=False):
+    """Asyncio version of fetch_from_chain; losing and overdue attempts are cancelled outright"""
+    budget, deadline = get_hedge_timing(interval)
+    remaining = list(data_sources)
+    running = {}
+    
+    async def attempt(source):
+        _request_deadline.set(deadline)
+        _provider_unavailable.set(False)
+        started = time.monotonic()
+        try:
+            df = await source.fetch_async(http, symbol, interval, start_date, end_date)
         except Exception as e:
-            error_msg = f"Error from {source.name} for {symbol}: {str(e)}"
-            logger.error(error_msg)
-            errors.append(error_msg)
+            logger.error(f"Error from {source.name} for {symbol}: {str(e)}")
+            df = None
+        return df, time.monotonic() - started, _provider_unavailable.get()
     
-    if df is None or df.empty:
-        logger.warning(f"Failed to fetch data for {symbol} from all sources")
+    def start_next():
+        source = remaining.pop(0)
+        logger.info(f"Trying {source.name} for {symbol} ({interval})")
+        running[asyncio.ensure_future(attempt(source))] = source
+    
+    try:
+        while remaining or running:
+            if not running:
+                start_next()
+            
+            time_left = deadline - time.monotonic()
+            if time_left <= 0:
+                logger.warning(f"Giving up on {symbol} ({interval}) after its {FETCH_DEADLINE.get(interval, FETCH_DEADLINE['1h'])}s deadline")
+                break
+            timeout = min(time_left, budget) if budget is not None and remaining else time_left
+            
+            done, _ = await asyncio.wait(set(running), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                if remaining and timeout < time_left:
+                    logger.info(f"{', '.join(source.name for source in running.values())} slow for {symbol} ({interval}), "
+                                f"hedging with {remaining[0].name}")
+                    start_next()
+                continue
+            
+            for task in done:
+                source = running.pop(task)
+                df, latency, unavailable = task.result()
+                if df is not None and not df.empty:
+                    return source, df, latency
+                record_lookup_failure(symbol, interval, source, unavailable or tail)
+            
+            # A failed source hands over to the next one straight away
+            if remaining:
+                start_next()
+        return None, None, None
+    finally:
+        for task in running:
+            task.cancel()
+
+def get_fetch_window(interval, existing=None):
+    """Get the (start_date, end_date) to request for an interval.
+    
+    With an existing series, the window starts on the day of its last bar so only
+    the tail is fetched.
+    """
+    end_date = datetime.now().strftime("%Y-%m-%d")
+    
+    # Determine lookback period based on interval
+    days_lookback = LOOKBACK_DAYS.get(interval, 7)
+    start_dt = datetime.now() - timedelta(days=days_lookback)
+    if existing is not None and not existing.empty:
+        start_dt = max(start_dt, existing.index[-1].to_pydatetime())
+    return start_dt.strftime("%Y-%m-%d"), end_date
+
+def get_incremental_base(symbol, interval, force_refresh=False):
+    """Get the expired cached series that a tail fetch should extend, or None for a full fetch"""
+    if not INCREMENTAL_FETCH or force_refresh:
+        return None
+    existing = load_from_cache(symbol, interval, allow_stale=True)
+    if existing is None or existing.empty:
         return None
     
+    # A tail that no longer reaches the lookback window is not worth extending
+    start_date, _ = get_fetch_window(interval)
+    if existing.index[-1] < pd.Timestamp(start_date):
+        return None
+    return existing
+
+def merge_series(existing, df, interval):
+    """Merge newly fetched bars into an existing series, keeping the newest copy of each bar"""
+    if existing is None or existing.empty:
+        return df
+    
+    merged = pd.concat([existing, df])
+    merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+    
+    # Drop bars that have aged out of the lookback window
+    start_date, _ = get_fetch_window(interval)
+    merged = merged[merged.index >= pd.Timestamp(start_date)]
+    logger.info(f"Merged {len(df)} fetched bars into {len(existing)} cached bars ({len(merged)} total)")
+    return merged
+
+def store_series(symbol, interval, df, derive=True):
+    """Write a fetched series to the cache, output and chart-data sinks.
+    
+    With derive=False the coarser intervals are not rebuilt from it, e.g. when its
+    volumes are rolling totals that resampling cannot turn into per-bar volumes.
+    """
     # Cache the results
     save_to_cache(symbol, interval, df)
     
@@ -930,7 +2818,86 @@ def fetch_data_with_fallback(symbol, interval="1h", force_refresh=False):
     # Save in candles format for charting libraries
     save_candles_format(symbol, interval, df)
     
-    return df
+    # Refresh the coarser intervals built from this one
+    if derive:
+        store_derived_series(symbol, interval, df)
+    elif DERIVED_INTERVALS.get(interval):
+        logger.info(f"Not deriving coarser intervals for {symbol} from rolling-volume {interval} data, leaving them to providers")
+
+def resample_ohlcv(df, interval, offset=None, volume="sum"):
+    """Aggregate OHLCV bars into a coarser interval.
+    
+    Bins are anchored to the epoch shifted by offset, and bins without any bars
+    (weekends, holidays, closed sessions) are dropped rather than filled. Volume
+    is summed, or with volume="last" taken from each bin's last bar.
+    """
+    aggregations = {"open": "first", "high": "max", "low": "min", "close": "last"}
+    if "volume" in df.columns:
+        aggregations["volume"] = volume
+    
+    resampled = df.resample(INTERVAL_DURATIONS[interval], origin="epoch", offset=offset).agg(aggregations)
+    return resampled.dropna(subset=["open", "high", "low", "close"])
+
+def get_session_offset(existing, interval):
+    """Get the bin offset an existing series uses, so derived bars line up with provider bars"""
+    if existing is None or existing.empty:
+        return None
+    return (existing.index[-1] - pd.Timestamp(0)) % INTERVAL_DURATIONS[interval]
+
+def derive_series(symbol, base_df, interval):
+    """Resample a base series into a coarser interval merged with its cached series.
+    
+    Returns None when the base series cannot cover the interval, i.e. there is no
+    cached series for it to extend and the base does not reach back over its
+    whole lookback window; such intervals are still fetched from providers.
+    """
+    existing = load_from_cache(symbol, interval, allow_stale=True)
+    duration = INTERVAL_DURATIONS[interval]
+    
+    if existing is not None and not existing.empty:
+        if existing.index[-1] + duration < base_df.index[0]:
+            return None
+    else:
+        existing = None
+        start_date, _ = get_fetch_window(interval)
+        if base_df.index[0] > pd.Timestamp(start_date):
+            return None
+    
+    derived = resample_ohlcv(base_df, interval, get_session_offset(existing, interval))
+    
+    # A first bin that starts before the base series would be built from a partial bar
+    if not derived.empty and derived.index[0] < base_df.index[0]:
+        derived = derived.iloc[1:]
+    # Only extend the cached series: bars before its last one may be native provider
+    # bars, which derived bars must not replace
+    if existing is not None:
+        derived = derived[derived.index >= existing.index[-1]]
+    if derived.empty:
+        return None
+    
+    return merge_series(existing, derived, interval)
+
+def store_derived_series(symbol, base_interval, base_df):
+    """Derive and store every interval configured in DERIVED_INTERVALS for a fresh base series"""
+    for interval in DERIVED_INTERVALS.get(base_interval, []):
+        try:
+            df = derive_series(symbol, base_df, interval)
+            if df is None:
+                logger.info(f"Not enough {base_interval} history to derive {symbol} ({interval}), leaving it to providers")
+                continue
+            logger.info(f"Derived {len(df)} {interval} bars for {symbol} from {base_interval} data")
+            store_series(symbol, interval, df)
+        except Exception as e:
+            logger.error(f"Error deriving {symbol} ({interval}) from {base_interval}: {e}")
+
+def is_derived_interval(interval):
+    """Check whether an interval is normally derived from a finer base interval"""
+    return any(interval in derived for derived in DERIVED_INTERVALS.values())
+
+def merge_interval_outputs(interval):
+    """Merge the consolidated outputs for an interval and the intervals derived from it"""
+    for name in [interval] + DERIVED_INTERVALS.get(interval, []):
+        merge_output_partitions(name)
 
 def fetch_forex_pair(base_currency, quote_currency, interval="1d", force_refresh=False):
     """Fetch data for a forex pair directly"""
@@ -953,69 +2920,177 @@ def fetch_forex_pair(base_currency, quote_currency, interval="1d", force_refresh
     if df is not None and not df.empty:
         return df
     
-    # If direct pair fails, try to calculate via USD
+    # If direct pair fails, try to calculate via USD from the (at most two) legs
     logger.info(f"Direct fetch failed for {forex_symbol}, trying cross-calculation")
+    frames = {}
+    for leg in (base_currency, quote_currency):
+        if leg != "USD":
+            df = fetch_data_with_fallback(leg, interval, force_refresh)
+            if df is not None and not df.empty:
+                frames[leg] = df
+    pair = (base_currency, quote_currency)
+    return compute_cross_pairs([pair], frames, interval).get(pair)
+
+def synthesize_cross_pairs(pairs, interval="1d", force_refresh=False):
+    """Compute cross rates for many (base, quote) pairs from their USD legs.
     
-    # Get base/USD
-    base_usd = None
-    if base_currency != "USD":
-        base_usd = fetch_data_with_fallback(base_currency, interval, force_refresh)
+    Every non-USD leg is fetched once, the legs are aligned into one panel, and all
+    pairs are divided out together. Each pair is stored as "BASE-QUOTE" through the
+    normal sinks. Returns {(base, quote): df} for the pairs that could be computed.
+    """
+    pairs = list(dict.fromkeys((base, quote) for base, quote in pairs if base != quote))
+    legs = sorted({currency for pair in pairs for currency in pair if currency != "USD"})
     
-    # Get quote/USD
-    quote_usd = None
-    if quote_currency != "USD":
-        quote_usd = fetch_data_with_fallback(quote_currency, interval, force_refresh)
-    
-    # Calculate cross-rate
-    if base_currency == "USD" and quote_usd is not None:
-        # USD/quote = 1/(quote/USD)
-        df = quote_usd.copy()
-        df["open"] = 1.0 / df["open"]
-        df["high"] = 1.0 / df["low"]  # Note high/low swap
-        df["low"] = 1.0 / df["high"]
-        df["close"] = 1.0 / df["close"]
-    elif base_usd is not None and quote_currency == "USD":
-        # base/USD direct
-        df = base_usd
-    elif base_usd is not None and quote_usd is not None:
-        # base/quote = (base/USD) / (quote/USD)
-        # Find common dates
-        common_index = base_usd.index.intersection(quote_usd.index)
-        if len(common_index) == 0:
-            logger.warning(f"No overlapping dates for {base_currency}/{quote_currency}")
-            return None
-        
-        # Align dataframes
-        aligned_base = base_usd.loc[common_index]
-        aligned_quote = quote_usd.loc[common_index]
-        
-        # Calculate cross rate
-        df = pd.DataFrame(index=common_index)
-        df["open"] = aligned_base["open"] / aligned_quote["open"]
-        df["high"] = aligned_base["high"] / aligned_quote["low"]
-        df["low"] = aligned_base["low"] / aligned_quote["high"]
-        df["close"] = aligned_base["close"] / aligned_quote["close"]
-        df["volume"] = aligned_base["volume"]
-    else:
-        logger.warning(f"Missing data to calculate {base_currency}/{quote_currency}")
-        return None
+    # Fetch each USD leg once (batched and in parallel like any asset list); the
+    # outputs are merged once below, after the pairs are stored too
+    frames = process_asset_list(legs, interval, force_refresh, merge_outputs=False) if legs else {}
+    results = compute_cross_pairs(pairs, frames, interval)
+    merge_interval_outputs(interval)
+    logger.info(f"Synthesized {len(results)}/{len(pairs)} cross pairs ({interval}) from {len(legs)} USD legs")
+    return results
+
+def compute_cross_pairs(pairs, frames, interval):
+    """Divide out and store the cross rates for (base, quote) pairs from fetched USD legs.
     
-    # Cache this calculated pair
-    symbol = f"{base_currency}-{quote_currency}"
-    save_to_cache(symbol, interval, df)
-    save_to_output(symbol, interval, df)
-    save_candles_format(symbol, interval, df)
+    frames maps each non-USD currency to its USD series. Returns {(base, quote): df}
+    for the pairs that could be computed.
+    """
+    legs = sorted(frames)
     
-    return df
+    # Aligned panel: one column per leg, with USD as a constant 1.0 leg
+    columns = ["USD"] + legs
+    position = {currency: i for i, currency in enumerate(columns)}
+    index = pd.DatetimeIndex([])
+    for leg in columns[1:]:
+        index = index.union(frames[leg].index)
+    
+    panel = {}
+    for field in ["open", "high", "low", "close", "volume"]:
+        values = np.full((len(index), len(columns)), np.nan)
+        values[:, 0] = 0.0 if field == "volume" else 1.0
+        for leg in columns[1:]:
+            df = frames[leg][~frames[leg].index.duplicated(keep="last")]
+            if field in df.columns:
+                values[:, position[leg]] = df[field].reindex(index).to_numpy(dtype=np.float64)
+            elif field == "volume":
+                values[:, position[leg]] = 0.0
+        panel[field] = values
+    
+    computable = [pair for pair in pairs if pair[0] in position and pair[1] in position]
+    for base, quote in pairs:
+        if (base, quote) not in computable:
+            logger.warning(f"Missing data to calculate {base}/{quote}")
+    if not computable or len(index) == 0:
+        return {}
+    
+    # base/quote = (base/USD) / (quote/USD) for every pair at once; the quote's
+    # low bounds the cross high and its high bounds the cross low
+    b = np.array([position[base] for base, _ in computable])
+    q = np.array([position[quote] for _, quote in computable])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cross = {
+            "open": panel["open"][:, b] / panel["open"][:, q],
+            "high": panel["high"][:, b] / panel["low"][:, q],
+            "low": panel["low"][:, b] / panel["high"][:, q],
+            "close": panel["close"][:, b] / panel["close"][:, q],
+            # Volume comes from the non-USD side, preferring the base
+            "volume": np.where(b == 0, panel["volume"][:, q], panel["volume"][:, b])
+        }
+    
+    results = {}
+    for p, (base, quote) in enumerate(computable):
+        rows = np.isfinite(cross["close"][:, p])
+        if not rows.any():
+            logger.warning(f"No overlapping dates for {base}/{quote}")
+            continue
+        df = pd.DataFrame({field: values[rows, p] for field, values in cross.items()}, index=index[rows])
+        df.index.name = "timestamp"
+        
+        # Cache this calculated pair
+        store_series(f"{base}-{quote}", interval, df)
+        results[(base, quote)] = df
+    return results
+
+def get_batch_series_groups(assets, interval, force_refresh=False):
+    """Group stale symbols by a primary source that can fetch them in one batch"""
+    groups = {}
+    for symbol in assets:
+        if not force_refresh and is_cache_valid(symbol, interval):
+            continue
+        # Symbols every provider recently failed on are skipped, and providers that recently
+        # failed on a symbol are not asked again; with no source left the fallback path reports it
+        if is_negative_cached(symbol, interval):
+            continue
+        chain = filter_negative_cached(symbol, interval, get_source_chain(symbol, interval))
+        if not chain:
+            continue
+        source = chain[0]
+        if source.supports_batch_series:
+            groups.setdefault(source.name, (source, []))[1].append(symbol)
+    
+    # A batch of one saves nothing over the normal fallback path
+    return [(source, symbols) for source, symbols in groups.values() if len(symbols) > 1]
 
-def process_asset_list(assets, interval="1h", force_refresh=False):
-    """Process a list of assets in parallel"""
+def get_batch_fetch_window(symbols, interval, force_refresh=False):
+    """Get the incremental bases for a batch and one fetch window that covers all of them"""
+    existing = {symbol: get_incremental_base(symbol, interval, force_refresh) for symbol in symbols}
+    bases = list(existing.values())
+    if any(base is None for base in bases):
+        return existing, get_fetch_window(interval)
+    return existing, get_fetch_window(interval, min(bases, key=lambda base: base.index[-1]))
+
+def store_batch_series(source, symbols, interval, frames, existing, latency):
+    """Store the frames returned by a batch fetch and return the successful ones"""
+    results = {}
+    for symbol, df in frames.items():
+        if df is not None and not df.empty:
+            _routes.record(symbol, interval, source.name, latency, len(df))
+            df = merge_series(existing.get(symbol), df, interval)
+            store_series(symbol, interval, df, derive=not source.rolling_volume)
+            results[symbol] = df
+    logger.info(f"Batch-fetched {len(results)}/{len(symbols)} symbols from {source.name} ({interval})")
+    return results
+
+def prefetch_batch_series(assets, interval, force_refresh=False):
+    """Fetch symbols that route to a batch-capable source with multi-symbol requests.
+    
+    Returns (results, missed) where missed maps each symbol a successful batch
+    response had no data for to the batch provider, so the per-symbol fallback does
+    not ask it again. Symbols of a failed batch request keep the provider in their chain.
+    """
     results = {}
+    missed = {}
+    try:
+        groups = get_batch_series_groups(assets, interval, force_refresh)
+    except Exception as e:
+        logger.error(f"Error grouping symbols for batch fetches ({interval}): {e}")
+        return results, missed
+    for source, symbols in groups:
+        try:
+            existing, (start_date, end_date) = get_batch_fetch_window(symbols, interval, force_refresh)
+            started = time.monotonic()
+            frames = source.fetch_many(symbols, interval, start_date, end_date)
+            results.update(store_batch_series(source, symbols, interval, frames, existing, time.monotonic() - started))
+            missed.update((symbol, source.name) for symbol in frames if symbol not in results)
+        except Exception as e:
+            logger.error(f"Error batch-fetching from {source.name} ({interval}): {e}")
+    return results, missed
+
+def process_asset_list(assets, interval="1h", force_refresh=False, merge_outputs=True):
+    """Process a list of assets in parallel.
+    
+    With merge_outputs=False the consolidated outputs are left for the caller to merge.
+    """
+    # Symbols answered by a batch request skip the per-symbol fallback path;
+    # anything the batch missed still gets the full fallback chain
+    results, missed = prefetch_batch_series(assets, interval, force_refresh)
+    assets = [symbol for symbol in assets if symbol not in results]
     failed = []
     
     def process_asset(symbol):
         try:
-            df = fetch_data_with_fallback(symbol, interval, force_refresh)
+            exclude = (missed[symbol],) if symbol in missed else ()
+            df = fetch_data_with_fallback(symbol, interval, force_refresh, exclude)
             if df is not None and not df.empty:
                 return symbol, df
             return symbol, None
@@ -1038,6 +3113,9 @@ def process_asset_list(assets, interval="1h", force_refresh=False):
     if failed:
         logger.info(f"Failed assets: {', '.join(failed)}")
     
+    if merge_outputs:
+        merge_interval_outputs(interval)
+    save_provider_health()
     return results
 
 def update_forex_pairs(intervals=None):
@@ -1076,12 +3154,10 @@ def update_stocks_and_etfs(intervals=None):
     for interval in intervals:
         logger.info(f"Processing stocks and ETFs with interval {interval}")
         results = process_asset_list(assets, interval)
-        logger.info(f"Completed stocks and ETFs with interval {interval}: {len(results)} assets updated")
-
-def update_all_asset_data():
-    """Update data for all assets"""
-    ensure_dirs()
-    
+        logger.info(f"Completed stocks and ETFs with interval {interval}: {len(results)} assets updated")
+
+def get_update_configs():
+    """Get the (assets, interval) configurations covered by a full update"""
     # Process different asset classes and intervals
     asset_configs = [
         {"assets": CRYPTO, "interval": "1h", "name": "cryptocurrencies (hourly)"},
@@ -1098,6 +3174,10 @@ def update_all_asset_data():
         {"assets": ETFS, "interval": "1d", "name": "ETFs (daily)"}
     ]
     
+    # Derived intervals (see DERIVED_INTERVALS) stay listed after their base: they are
+    # answered from the cache the base fetch wrote, and only reach providers when
+    # there was not enough base history to derive them
+    
     # Add intraday data for forex pairs
     intraday_intervals = ["1m", "5m", "15m", "30m"]
     major_forex = FOREX_PAIRS[:10]  # Use only major pairs for intraday to conserve API calls
@@ -1109,8 +3189,14 @@ def update_all_asset_data():
             "name": f"major forex pairs ({interval})"
         })
     
+    return asset_configs
+
+def update_all_asset_data():
+    """Update data for all assets"""
+    ensure_dirs()
+    
     # Process each configuration
-    for config in asset_configs:
+    for config in get_update_configs():
         logger.info(f"Updating {config['name']}...")
         results = process_asset_list(config["assets"], config["interval"])
         logger.info(f"Completed {config['name']}: {len(results)} assets updated")
@@ -1118,110 +3204,612 @@ def update_all_asset_data():
     # Copy all data to public/chart-data directory
     logger.info("Copying all data to public/chart-data directory")
     ensure_public_chart_data()
+    log_frame_cache_stats()
+    log_write_stats()
+    log_provider_health()
+    report_dead_symbols()
+
+# ----- Asyncio Fetch Engine -----
+async def fetch_data_with_fallback_async(symbol, interval="1h", force_refresh=False, http=None, exclude=()):
+    """Asyncio version of fetch_data_with_fallback, sharing one AsyncHttpClient"""
+    if http is None:
+        async with AsyncHttpClient() as http:
+            return await fetch_data_with_fallback_async(symbol, interval, force_refresh, http, exclude)
+    
+    # Check cache first unless force refresh
+    if not force_refresh:
+        cached_data = load_from_cache(symbol, interval)
+        if cached_data is not None and not cached_data.empty:
+            logger.info(f"Using cached data for {symbol} ({interval})")
+            return cached_data
+    
+    # Calculate date range based on interval, starting at the cached tail if there is one
+    existing = get_incremental_base(symbol, interval, force_refresh)
+    start_date, end_date = get_fetch_window(interval, existing)
+    
+    if is_negative_cached(symbol, interval):
+        logger.info(f"Skipping {symbol} ({interval}): every provider recently failed to return it")
+        return None
+    data_sources = filter_negative_cached(symbol, interval, get_source_chain(symbol, interval))
+    data_sources = [source for source in data_sources if source.name not in exclude]
+    
+    # Try the sources until one returns data, hedging slow ones
+    source, df, latency = await fetch_from_chain_async(http, symbol, interval, data_sources, start_date, end_date,
+                                                       tail=existing is not None)
+    if df is None:
+        logger.warning(f"Failed to fetch data for {symbol} from all sources")
+        return None
+    
+    logger.info(f"Successfully fetched data from {source.name} for {symbol}")
+    _routes.record(symbol, interval, source.name, latency, len(df))
+    _negative_cache.record_success(symbol, interval, source.name)
+    
+    # Merging and the cache/output writes are pandas and disk work: keep them off the event loop
+    df = await asyncio.to_thread(merge_series, existing, df, interval)
+    await asyncio.to_thread(store_series, symbol, interval, df, not source.rolling_volume)
+    return df
+
+async def prefetch_batch_series_async(assets, interval, force_refresh=False, http=None):
+    """Asyncio version of prefetch_batch_series"""
+    results = {}
+    missed = {}
+    try:
+        groups = get_batch_series_groups(assets, interval, force_refresh)
+    except Exception as e:
+        logger.error(f"Error grouping symbols for batch fetches ({interval}): {e}")
+        return results, missed
+    for source, symbols in groups:
+        try:
+            existing, (start_date, end_date) = get_batch_fetch_window(symbols, interval, force_refresh)
+            started = time.monotonic()
+            frames = await source.fetch_many_async(http, symbols, interval, start_date, end_date)
+            results.update(await asyncio.to_thread(store_batch_series, source, symbols, interval, frames, existing,
+                                                   time.monotonic() - started))
+            missed.update((symbol, source.name) for symbol in frames if symbol not in results)
+        except Exception as e:
+            logger.error(f"Error batch-fetching from {source.name} ({interval}): {e}")
+    return results, missed
+
+async def process_asset_list_async(assets, interval="1h", force_refresh=False, http=None):
+    """Process a list of assets concurrently on the event loop"""
+    if http is None:
+        async with AsyncHttpClient() as http:
+            return await process_asset_list_async(assets, interval, force_refresh, http)
+    
+    results, missed = await prefetch_batch_series_async(assets, interval, force_refresh, http)
+    assets = [symbol for symbol in assets if symbol not in results]
+    
+    async def process_asset(symbol):
+        try:
+            exclude = (missed[symbol],) if symbol in missed else ()
+            df = await fetch_data_with_fallback_async(symbol, interval, force_refresh, http, exclude)
+            if df is not None and not df.empty:
+                return symbol, df
+            return symbol, None
+        except Exception as e:
+            logger.error(f"Error processing {symbol}: {e}")
+            return symbol, None
+    
+    failed = []
+    for symbol, df in await asyncio.gather(*(process_asset(symbol) for symbol in assets)):
+        if df is not None:
+            results[symbol] = df
+        else:
+            failed.append(symbol)
+    
+    logger.info(f"Processed {len(results)} assets successfully, {len(failed)} failed")
+    if failed:
+        logger.info(f"Failed assets: {', '.join(failed)}")
+    
+    merge_interval_outputs(interval)
+    save_provider_health()
+    return results
+
+async def update_all_asset_data_async():
+    """Update data for all assets, running every symbol and interval on one event loop"""
+    ensure_dirs()
+    
+    async def process_config(config, http):
+        logger.info(f"Updating {config['name']}...")
+        results = await process_asset_list_async(config["assets"], config["interval"], http=http)
+        logger.info(f"Completed {config['name']}: {len(results)} assets updated")
+    
+    # Concurrency is bounded per provider by the client, not per configuration.
+    # Derived intervals run after their base intervals so they can be served from the cache.
+    configs = get_update_configs()
+    phases = [
+        [config for config in configs if not is_derived_interval(config["interval"])],
+        [config for config in configs if is_derived_interval(config["interval"])]
+    ]
+    async with AsyncHttpClient() as http:
+        for phase in phases:
+            await asyncio.gather(*(process_config(config, http) for config in phase))
+    
+    # Copy all data to public/chart-data directory
+    logger.info("Copying all data to public/chart-data directory")
+    ensure_public_chart_data()
+    log_frame_cache_stats()
+    log_write_stats()
+    log_provider_health()
+    report_dead_symbols()
+
+def load_publish_manifest():
+    """Load the published-artifact manifest ({"dirs": {...}, "artifacts": {...}})"""
+    try:
+        with open(PUBLISH_MANIFEST_PATH, "r") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        manifest = {}
+    manifest.setdefault("dirs", {})
+    manifest.setdefault("artifacts", {})
+    return manifest
+
+def publish_artifact(file, input_path, date_str, stat, manifest):
+    """Copy one output file to public/chart-data if its content changed. Returns True if copied."""
+    artifacts = manifest["artifacts"]
+    published = artifacts.get(file)
+    
+    # A series from an older day never replaces the one published from a newer day
+    if published is not None and published["date"] > date_str:
+        return False
+    if published is not None and published["source"] == input_path and \
+       (published["size"], published["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+        return False
+    
+    with open(input_path, "rb") as f:
+        payload = f.read()
+    digest = hashlib.blake2b(payload, digest_size=16).hexdigest()
+    output_path = os.path.join(PUBLIC_CHART_DATA, file)
+    copied = False
+    if published is None or published["hash"] != digest or not os.path.exists(output_path):
+        copied = _file_writer.write(output_path, payload)
+        if copied:
+            logger.info(f"Copied {file} to public/chart-data")
+    
+    artifacts[file] = {
+        "source": input_path,
+        "date": date_str,
+        "hash": digest,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "target": output_path
+    }
+    
+    # Also create candles format if it doesn't exist
+    parts = file.split('_')
+    if len(parts) >= 2:
+        symbol = parts[0]
+        interval = parts[1].replace('.json', '')
+        candles_path = os.path.join(PUBLIC_CHART_DATA, f"{symbol}_{interval}_candles.json")
+        if not os.path.exists(candles_path):
+            data = json.loads(payload)
+            if isinstance(data, list) and len(data) > 0:
+                _file_writer.write(candles_path, json.dumps(records_to_candles(data)))
+                logger.info(f"Created candles format for {symbol} ({interval})")
+    return copied
 
 def ensure_public_chart_data():
-    """Ensure all data is available in the public/chart-data directory"""
+    """Ensure all data is available in the public/chart-data directory.
+    
+    Works as a diff against the publish manifest: only dated output directories
+    whose mtime changed are listed, only files whose size or mtime changed are
+    read, and only content with a new hash is copied.
+    """
     try:
         # Ensure directory exists
         Path(PUBLIC_CHART_DATA).mkdir(parents=True, exist_ok=True)
-        
-        # Walk through the output directory
-        for root, dirs, files in os.walk(OUTPUT_DIR):
-            for file in files:
-                if file.endswith(".json") and not file.startswith("all_"):
-                    input_path = os.path.join(root, file)
-                    output_path = os.path.join(PUBLIC_CHART_DATA, file)
-                    
-                    # Copy file if it doesn't exist or is older
-                    if not os.path.exists(output_path) or \
-                       os.path.getmtime(input_path) > os.path.getmtime(output_path):
-                        shutil.copy2(input_path, output_path)
-                        logger.info(f"Copied {file} to public/chart-data")
-                    
-                    # Also create candles format if it doesn't exist
-                    parts = file.split('_')
-                    if len(parts) >= 2:
-                        symbol = parts[0]
-                        interval = parts[1].replace('.json', '')
-                        
-                        candles_file = f"{symbol}_{interval}_candles.json"
-                        candles_path = os.path.join(PUBLIC_CHART_DATA, candles_file)
-                        
-                        if not os.path.exists(candles_path):
-                            # Load data and convert to candles format
-                            with open(input_path, 'r') as f:
-                                data = json.load(f)
-                            
-                            if isinstance(data, list) and len(data) > 0:
-                                # Convert to candles format
-                                candles = []
-                                for item in data:
-                                    if "timestamp" in item and "open" in item:
-                                        ts = datetime.fromisoformat(item["timestamp"]).timestamp() * 1000
-                                        candle = [
-                                            int(ts),
-                                            float(item["open"]),
-                                            float(item["high"]),
-                                            float(item["low"]),
-                                            float(item["close"]),
-                                            float(item.get("volume", 0))
-                                        ]
-                                        candles.append(candle)
-                                
-                                with open(candles_path, 'w') as f:
-                                    json.dump(candles, f)
-                                logger.info(f"Created candles format for {symbol} ({interval})")
-        
-        logger.info("Ensured all data is available in public/chart-data directory")
+        manifest = load_publish_manifest()
+        
+        # Newest day first: each series is published from the newest day that has it
+        dates = sorted((name for name in os.listdir(OUTPUT_DIR)
+                        if is_date_string(name) and os.path.isdir(os.path.join(OUTPUT_DIR, name))), reverse=True)
+        seen = set()
+        scanned = 0
+        copied = 0
+        for date_str in dates:
+            day_dir = os.path.join(OUTPUT_DIR, date_str)
+            dir_mtime = os.stat(day_dir).st_mtime_ns
+            if manifest["dirs"].get(date_str) == dir_mtime:
+                continue
+            
+            scanned += 1
+            for file in sorted(os.listdir(day_dir)):
+                if not file.endswith(".json") or file.startswith("all_") or file in seen:
+                    continue
+                seen.add(file)
+                input_path = os.path.join(day_dir, file)
+                try:
+                    if publish_artifact(file, input_path, date_str, os.stat(input_path), manifest):
+                        copied += 1
+                except Exception as e:
+                    logger.error(f"Error publishing {input_path}: {e}")
+            manifest["dirs"][date_str] = dir_mtime
+        
+        # Forget directories that were removed
+        for date_str in [name for name in manifest["dirs"] if name not in dates]:
+            del manifest["dirs"][date_str]
+        
+        if scanned:
+            atomic_write(PUBLISH_MANIFEST_PATH, json.dumps(manifest))
+        logger.info(f"Ensured all data is available in public/chart-data directory "
+                    f"({scanned} changed directories, {copied} files copied)")
     except Exception as e:
         logger.error(f"Error ensuring public chart data: {e}")
 
+CONSOLIDATED_RECORD_COLUMNS = ["symbol", "timestamp", "open", "high", "low", "close", "volume", "interval"]
+
+def is_date_string(name):
+    """Check whether a name is a YYYY-MM-DD date (the dated output directories)"""
+    try:
+        datetime.strptime(name, "%Y-%m-%d")
+        return True
+    except ValueError:
+        return False
+
+def iter_dated_output_files():
+    """Yield (key, path) for every per-symbol JSON file in the dated output directories, oldest first"""
+    for name in sorted(os.listdir(OUTPUT_DIR)):
+        day_dir = os.path.join(OUTPUT_DIR, name)
+        if not is_date_string(name) or not os.path.isdir(day_dir):
+            continue
+        for file in sorted(os.listdir(day_dir)):
+            if file.endswith(".json") and not file.startswith("all_"):
+                yield f"{name}/{file}", os.path.join(day_dir, file)
+
+def iter_file_chunks(path, chunk_size=1024 * 1024):
+    """Yield a text file in fixed-size chunks"""
+    with open(path, "r") as f:
+        yield from iter(lambda: f.read(chunk_size), "")
+
+def stream_write(path, chunks):
+    """Write an iterable of text chunks to path via a temporary file and os.replace"""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def build_consolidation_fragment(key, path):
+    """Convert one output file into JSON, CSV (and Parquet) fragments, returning its manifest entry"""
+    stat = os.stat(path)
+    with open(path, "r") as f:
+        data = json.load(f)
+    if not isinstance(data, list):
+        data = []
+    
+    base = os.path.join(CONSOLIDATED_DIR, "fragments", key[:-len(".json")])
+    Path(os.path.dirname(base)).mkdir(parents=True, exist_ok=True)
+    
+    # The records as they appear inside an indent=2 JSON array, without the brackets
+    atomic_write(base + ".json", json.dumps(data, indent=2)[2:-2] if data else "")
+    frame = pd.DataFrame(data, columns=CONSOLIDATED_RECORD_COLUMNS)
+    atomic_write(base + ".csv", frame.to_csv(index=False, header=False))
+    if OUTPUT_COLUMNAR and has_pyarrow():
+        frame = frame.astype({"symbol": str, "timestamp": str, "interval": str})
+        frame = frame.astype({column: np.float64 for column in ["open", "high", "low", "close", "volume"]})
+        frame.to_parquet(base + ".parquet", index=False)
+    
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "records": len(data), "fragment": base}
+
+def remove_consolidation_fragment(entry):
+    for extension in (".json", ".csv", ".parquet"):
+        try:
+            os.remove(entry["fragment"] + extension)
+        except FileNotFoundError:
+            pass
+
+def consolidated_json_chunks(entries):
+    """Stream the consolidated JSON array from the fragments"""
+    yield "[\n"
+    first = True
+    for entry in entries:
+        if not entry["records"]:
+            continue
+        if not first:
+            yield ",\n"
+        first = False
+        yield from iter_file_chunks(entry["fragment"] + ".json")
+    yield "\n]"
+
+def consolidated_csv_chunks(entries):
+    """Stream the consolidated CSV from the fragments"""
+    yield ",".join(CONSOLIDATED_RECORD_COLUMNS) + "\n"
+    for entry in entries:
+        if entry["records"]:
+            yield from iter_file_chunks(entry["fragment"] + ".csv")
+
+def write_consolidated_parquet(path, entries):
+    """Append each fragment as a row group of one Parquet file"""
+    import pyarrow.parquet as pq
+    
+    tmp_path = path + ".tmp"
+    writer = None
+    try:
+        for entry in entries:
+            if not entry["records"] or not os.path.exists(entry["fragment"] + ".parquet"):
+                continue
+            table = pq.read_table(entry["fragment"] + ".parquet")
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema, compression="zstd")
+            writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is not None:
+        os.replace(tmp_path, path)
+
 def consolidate_output():
-    """Consolidate all output files into a single JSON and CSV file"""
+    """Consolidate all output files into a single JSON and CSV file.
+    
+    Each dated output file is converted once into fragments tracked by a manifest
+    (size and mtime); the consolidated files are streamed from the fragments, so
+    memory use does not grow with the number of days kept.
+    """
     try:
         logger.info("Consolidating output files...")
-        all_data = []
-        
-        # Walk through the output directory
-        for root, dirs, files in os.walk(OUTPUT_DIR):
-            for file in files:
-                if file.endswith(".json") and not file.startswith("all_"):
-                    file_path = os.path.join(root, file)
-                    try:
-                        with open(file_path, "r") as f:
-                            data = json.load(f)
-                            if isinstance(data, list):
-                                all_data.extend(data)
-                    except Exception as e:
-                        logger.error(f"Error reading file {file_path}: {e}")
-        
-        if all_data:
-            # Save consolidated JSON
-            json_path = os.path.join(OUTPUT_DIR, "all_market_data.json")
-            with open(json_path, "w") as f:
-                json.dump(all_data, f, indent=2)
-            
-            # Also save to public/chart-data
-            public_json_path = os.path.join(PUBLIC_CHART_DATA, "all_market_data.json")
-            with open(public_json_path, "w") as f:
-                json.dump(all_data, f, indent=2)
-            
-            # Save consolidated CSV
-            csv_path = os.path.join(OUTPUT_DIR, "all_market_data.csv")
-            df = pd.DataFrame(all_data)
-            df.to_csv(csv_path, index=False)
-            
-            # Also save to public/chart-data
-            public_csv_path = os.path.join(PUBLIC_CHART_DATA, "all_market_data.csv")
-            df.to_csv(public_csv_path, index=False)
-            
-            logger.info(f"Consolidated {len(all_data)} records to output and public/chart-data directories")
-        else:
+        Path(CONSOLIDATED_DIR).mkdir(parents=True, exist_ok=True)
+        manifest_path = os.path.join(CONSOLIDATED_DIR, "manifest.json")
+        try:
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            manifest = {}
+        
+        # Rebuild fragments only for new or modified files
+        files = dict(iter_dated_output_files())
+        changed = 0
+        for key, path in files.items():
+            stat = os.stat(path)
+            entry = manifest.get(key)
+            if entry is not None and (entry["size"], entry["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+                continue
+            try:
+                manifest[key] = build_consolidation_fragment(key, path)
+                changed += 1
+            except Exception as e:
+                logger.error(f"Error reading file {path}: {e}")
+        
+        for key in [key for key in manifest if key not in files]:
+            remove_consolidation_fragment(manifest.pop(key))
+            changed += 1
+        
+        json_path = os.path.join(OUTPUT_DIR, "all_market_data.json")
+        csv_path = os.path.join(OUTPUT_DIR, "all_market_data.csv")
+        parquet_path = os.path.join(OUTPUT_DIR, "all_market_data.parquet")
+        total = sum(entry["records"] for entry in manifest.values())
+        
+        if not total:
             logger.warning("No data found to consolidate")
+            atomic_write(manifest_path, json.dumps(manifest))
+            return
+        if not changed and os.path.exists(json_path) and os.path.exists(csv_path):
+            logger.info(f"Consolidated output is up to date ({total} records)")
+            return
+        
+        entries = [manifest[key] for key in sorted(manifest)]
+        stream_write(json_path, consolidated_json_chunks(entries))
+        stream_write(csv_path, consolidated_csv_chunks(entries))
+        outputs = [json_path, csv_path]
+        if OUTPUT_COLUMNAR and has_pyarrow():
+            write_consolidated_parquet(parquet_path, entries)
+            outputs.append(parquet_path)
+        
+        # Also save to public/chart-data
+        for path in outputs:
+            public_path = os.path.join(PUBLIC_CHART_DATA, os.path.basename(path))
+            shutil.copyfile(path, public_path + ".tmp")
+            os.replace(public_path + ".tmp", public_path)
+        
+        atomic_write(manifest_path, json.dumps(manifest))
+        logger.info(f"Consolidated {total} records ({changed} changed files) to output and public/chart-data directories")
     
     except Exception as e:
         logger.error(f"Error in consolidate_output: {e}")
 
+# ----- Output Archive -----
+def get_archive_backend():
+    """Get the archive file format selected by ARCHIVE_FORMAT"""
+    if ARCHIVE_FORMAT == "parquet" and has_pyarrow():
+        return ParquetCacheBackend()
+    return CompressedNpzBackend()
+
+def get_archive_path(symbol, interval):
+    """Get the archive partition file of a series"""
+    return os.path.join(ARCHIVE_DIR, interval, f"{symbol}.{get_archive_backend().extension}")
+
+def load_archive_manifest():
+    """Load the archive manifest ({"files": {...}, "partitions": {...}})"""
+    try:
+        with open(os.path.join(ARCHIVE_DIR, "manifest.json"), "r") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        manifest = {}
+    manifest.setdefault("files", {})
+    manifest.setdefault("partitions", {})
+    return manifest
+
+def is_archived(manifest, key, path):
+    """Check whether a dated output file has been compacted in its current state"""
+    entry = manifest["files"].get(key)
+    if entry is None:
+        return False
+    stat = os.stat(path)
+    return (entry["size"], entry["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns)
+
+def records_to_frame(data):
+    """Convert saved output records back into an OHLCV frame indexed by timestamp"""
+    df = pd.DataFrame(data, columns=["timestamp"] + OHLCV_COLUMNS)
+    df.index = pd.DatetimeIndex(pd.to_datetime(df.pop("timestamp"), format="ISO8601"), name="timestamp")
+    return df.astype(np.float64)
+
+def compact_partition(symbol, interval, frames):
+    """Merge snapshot frames (oldest first) into an archive partition, keeping the newest copy of each bar"""
+    backend = get_archive_backend()
+    path = get_archive_path(symbol, interval)
+    if os.path.exists(path):
+        frames = [backend.load(path)] + frames
+    
+    merged = pd.concat(frames)
+    merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+    Path(os.path.dirname(path)).mkdir(parents=True, exist_ok=True)
+    backend.save(path, symbol, interval, merged)
+    return merged
+
+def prune_dated_output(manifest, retention_days):
+    """Delete dated output directories older than the retention window once all their files are archived"""
+    cutoff = (datetime.now() - timedelta(days=retention_days)).strftime("%Y-%m-%d")
+    removed = 0
+    for name in sorted(os.listdir(OUTPUT_DIR)):
+        day_dir = os.path.join(OUTPUT_DIR, name)
+        if not is_date_string(name) or not os.path.isdir(day_dir) or name >= cutoff:
+            continue
+        
+        pending = [file for file in os.listdir(day_dir)
+                   if file.endswith(".json") and not file.startswith("all_")
+                   and not is_archived(manifest, f"{name}/{file}", os.path.join(day_dir, file))]
+        if pending:
+            logger.warning(f"Keeping {day_dir}: {len(pending)} files are not archived yet")
+            continue
+        
+        shutil.rmtree(day_dir)
+        for key in [key for key in manifest["files"] if key.startswith(f"{name}/")]:
+            del manifest["files"][key]
+        removed += 1
+    return removed
+
+def compact_output(retention_days=None):
+    """Compact the dated output snapshots into the archive, then prune old raw directories.
+    
+    Each snapshot file is read once (tracked by size and mtime in the archive
+    manifest) and its bars are merged into data/archive/{interval}/{symbol}, so the
+    archive grows with unique bars rather than with the number of snapshots.
+    Directories are only pruned with a retention (ARCHIVE_RETENTION_DAYS or
+    retention_days), since the consolidated outputs lose the pruned days.
+    """
+    if retention_days is None:
+        retention_days = ARCHIVE_RETENTION_DAYS
+    
+    try:
+        Path(ARCHIVE_DIR).mkdir(parents=True, exist_ok=True)
+        manifest = load_archive_manifest()
+        
+        # Group new or modified snapshot files by series, oldest day first
+        pending = {}
+        for key, path in iter_dated_output_files():
+            if is_archived(manifest, key, path):
+                continue
+            symbol, _, interval = os.path.basename(path)[:-len(".json")].rpartition("_")
+            if not symbol or interval not in INTERVAL_DURATIONS:
+                logger.warning(f"Not archiving {path}: not a {{symbol}}_{{interval}}.json series")
+                continue
+            pending.setdefault((symbol, interval), []).append((key, path))
+        
+        files = 0
+        for (symbol, interval), snapshots in pending.items():
+            try:
+                frames = []
+                stats = {}
+                for key, path in snapshots:
+                    stats[key] = os.stat(path)
+                    with open(path, "r") as f:
+                        data = json.load(f)
+                    if isinstance(data, list) and data:
+                        frames.append(records_to_frame(data))
+                
+                if frames:
+                    merged = compact_partition(symbol, interval, frames)
+                    manifest["partitions"][f"{symbol}_{interval}"] = {
+                        "path": get_archive_path(symbol, interval),
+                        "bars": len(merged),
+                        "first": merged.index[0].isoformat(),
+                        "last": merged.index[-1].isoformat()
+                    }
+                for key, stat in stats.items():
+                    manifest["files"][key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+                files += len(snapshots)
+            except Exception as e:
+                logger.error(f"Error archiving {symbol} ({interval}): {e}")
+        
+        removed = prune_dated_output(manifest, retention_days) if retention_days is not None else 0
+        atomic_write(os.path.join(ARCHIVE_DIR, "manifest.json"), json.dumps(manifest))
+        
+        bars = sum(entry["bars"] for entry in manifest["partitions"].values())
+        logger.info(f"Compacted {files} snapshot files into {len(pending)} archive partitions "
+                    f"({len(manifest['partitions'])} partitions, {bars} unique bars); "
+                    + (f"pruned {removed} dated directories older than {retention_days} days"
+                       if retention_days is not None else "dated directories kept"))
+    except Exception as e:
+        logger.error(f"Error in compact_output: {e}")
+
+def read_archive(symbol, interval, start=None, end=None):
+    """Read archived bars of a series between start and end (inclusive), or None if it is not archived"""
+    path = get_archive_path(symbol, interval)
+    if not os.path.exists(path):
+        return None
+    
+    df = get_archive_backend().load(path)
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    return df.loc[start:end]
+
+def get_latest_close(symbol, interval="1d"):
+    """Get the latest cached close of a series from the latest-bar index, or NaN"""
+    bar = get_latest_bar(symbol, interval)
+    if bar is None or not bar["close"] > 0:
+        return np.nan
+    return bar["close"]
+
+def get_usd_prices(currencies, interval="1d"):
+    """Get the USD price of each currency as an array, NaN where nothing is cached.
+    
+    Direct XXXUSD/USDXXX forex pairs are used first; otherwise the asset's own
+    series, which every source stores as USD per unit, is used.
+    """
+    position = {currency: i for i, currency in enumerate(currencies)}
+    usd = np.full(len(currencies), np.nan)
+    if "USD" in position:
+        usd[position["USD"]] = 1.0
+    
+    for pair in FOREX_PAIRS:
+        base, quote = pair[:3], pair[3:]
+        if quote == "USD" and base in position:
+            usd[position[base]] = get_latest_close(pair, interval)
+        elif base == "USD" and quote in position:
+            usd[position[quote]] = 1.0 / get_latest_close(pair, interval)
+    
+    for currency, i in position.items():
+        if np.isnan(usd[i]):
+            usd[i] = get_latest_close(currency, interval)
+    return usd
+
+def compute_exchange_rate_matrix(currencies, interval="1d"):
+    """Compute rate[i, j] (price of currency i in currency j) for every pair at once.
+    
+    Cross rates come from one outer division of the USD prices; direct pairs in
+    FOREX_PAIRS take precedence where they are cached.
+    """
+    usd = get_usd_prices(currencies, interval)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = np.divide.outer(usd, usd)
+    
+    position = {currency: i for i, currency in enumerate(currencies)}
+    for pair in FOREX_PAIRS:
+        base, quote = pair[:3], pair[3:]
+        if base in position and quote in position:
+            close = get_latest_close(pair, interval)
+            if not np.isnan(close):
+                rates[position[base], position[quote]] = close
+                rates[position[quote], position[base]] = 1.0 / close
+    
+    np.fill_diagonal(rates, 1.0)
+    return rates
+
 def create_exchange_rate_matrix():
     """Create a matrix of all currency exchange rates"""
     try:
@@ -1229,98 +3817,305 @@ def create_exchange_rate_matrix():
         
         # Get all currencies
         currencies = FIAT + CRYPTO + METALS
-        
-        # Get latest data
-        rates = {}
-        for base in currencies:
-            for quote in currencies:
-                if base != quote:
-                    symbol = f"{base}-{quote}"
-                    # Try to load from cache
-                    df = load_from_cache(symbol, "1d")
-                    if df is None or df.empty:
-                        # Try direct forex pair
-                        forex_symbol = f"{base}{quote}"
-                        df = load_from_cache(forex_symbol, "1d")
-                    
-                    if df is not None and not df.empty:
-                        # Get most recent rate
-                        latest = df.iloc[-1]
-                        rates[(base, quote)] = latest["close"]
+        rates = compute_exchange_rate_matrix(currencies)
+        logger.info(f"Computed {np.count_nonzero(~np.isnan(rates))}/{rates.size} exchange rates")
         
         # Create a matrix
-        matrix = []
-        for base in currencies:
-            row = {"base_currency": base}
-            for quote in currencies:
-                if base == quote:
-                    row[quote] = 1.0
-                else:
-                    row[quote] = rates.get((base, quote), float('nan'))
-            matrix.append(row)
-        
-        # Save to JSON and CSV
-        matrix_json_path = os.path.join(OUTPUT_DIR, "exchange_rate_matrix.json")
-        with open(matrix_json_path, "w") as f:
-            json.dump(matrix, f, indent=2)
-        
-        # Also save to public/chart-data
-        public_matrix_path = os.path.join(PUBLIC_CHART_DATA, "exchange_rate_matrix.json")
-        with open(public_matrix_path, "w") as f:
-            json.dump(matrix, f, indent=2)
-        
-        matrix_csv_path = os.path.join(OUTPUT_DIR, "exchange_rate_matrix.csv")
-        pd.DataFrame(matrix).to_csv(matrix_csv_path, index=False)
+        matrix = [
+            {"base_currency": base, **dict(zip(currencies, row))}
+            for base, row in zip(currencies, rates.tolist())
+        ]
         
-        # Also save to public/chart-data
-        public_matrix_csv_path = os.path.join(PUBLIC_CHART_DATA, "exchange_rate_matrix.csv")
-        pd.DataFrame(matrix).to_csv(public_matrix_csv_path, index=False)
+        # Save to JSON and CSV, in output and public/chart-data
+        matrix_json = json.dumps(matrix, indent=2)
+        matrix_csv = pd.DataFrame(matrix).to_csv(index=False)
+        for directory in (OUTPUT_DIR, PUBLIC_CHART_DATA):
+            _file_writer.write(os.path.join(directory, "exchange_rate_matrix.json"), matrix_json)
+            _file_writer.write(os.path.join(directory, "exchange_rate_matrix.csv"), matrix_csv)
         
         logger.info(f"Exchange rate matrix saved to output and public/chart-data directories")
     
     except Exception as e:
         logger.error(f"Error in create_exchange_rate_matrix: {e}")
 
-# ----- Scheduling and Main Function -----
-def setup_schedule():
-    """Set up the schedule for data updates"""
-    # Daily full refresh
-    schedule.every().day.at("00:00").do(update_all_asset_data)
-    schedule.every().day.at("00:30").do(consolidate_output)
-    schedule.every().day.at("01:00").do(create_exchange_rate_matrix)
-    
-    # Forex intraday updates (every 4 hours)
-    for hour in [4, 8, 12, 16, 20]:
-        schedule.every().day.at(f"{hour:02d}:00").do(
-            update_forex_pairs, 
-            ["1m", "5m", "15m", "30m", "1h"]
-        )
+def get_usd_series(currency, interval="1d"):
+    """Get a currency's USD close series from the cache (stale allowed), or None.
     
-    # Hourly updates for important assets
-    for hour in range(1, 24):
-        if hour % 4 == 0:
-            # Every 4 hours, update 4h data
-            schedule.every().day.at(f"{hour:02d}:00").do(
-                process_asset_list, 
-                FOREX_PAIRS[:10] + CRYPTO[:5],  # Major forex pairs and top crypto
-                "4h"
-            )
-        else:
-            # Every hour, update 1h data
-            schedule.every().day.at(f"{hour:02d}:00").do(
-                process_asset_list, 
-                FOREX_PAIRS[:10] + CRYPTO[:5],  # Major forex pairs and top crypto
-                "1h"
-            )
+    Uses the same leg preference as get_usd_prices.
+    """
+    if currency == "USD":
+        return None
+    for symbol, invert in [(f"{currency}USD", False), (f"USD{currency}", True), (currency, False)]:
+        if symbol != currency and symbol not in FOREX_PAIRS:
+            continue
+        df = load_from_cache(symbol, interval, allow_stale=True)
+        if df is not None and not df.empty:
+            close = df["close"].where(df["close"] > 0)
+            return 1.0 / close if invert else close
+    return None
+
+def align_to_grid(series, interval, grid):
+    """Snap a series onto a time grid, keeping the last value per grid step and carrying it forward"""
+    series = series.groupby(series.index.floor(INTERVAL_DURATIONS[interval])).last()
+    return series.reindex(grid.union(series.index)).sort_index().ffill().reindex(grid)
+
+def build_rate_cube(currencies, interval="1d"):
+    """Build the (time x base x quote) exchange-rate array for the interval's lookback window.
+    
+    USD legs are aligned on a common grid and divided in one broadcast; cached
+    direct pairs from FOREX_PAIRS take precedence where they have a value.
+    """
+    duration = INTERVAL_DURATIONS[interval]
+    start_date, _ = get_fetch_window(interval)
+    grid = pd.date_range(pd.Timestamp(start_date), pd.Timestamp.now().floor(duration), freq=duration, name="timestamp")
+    
+    usd = np.full((len(grid), len(currencies)), np.nan)
+    for i, currency in enumerate(currencies):
+        if currency == "USD":
+            usd[:, i] = 1.0
+            continue
+        series = get_usd_series(currency, interval)
+        if series is not None:
+            usd[:, i] = align_to_grid(series, interval, grid).to_numpy(dtype=np.float64)
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cube = usd[:, :, None] / usd[:, None, :]
+    
+    position = {currency: i for i, currency in enumerate(currencies)}
+    for pair in FOREX_PAIRS:
+        base, quote = pair[:3], pair[3:]
+        if base not in position or quote not in position:
+            continue
+        df = load_from_cache(pair, interval, allow_stale=True)
+        if df is None or df.empty:
+            continue
+        direct = align_to_grid(df["close"].where(df["close"] > 0), interval, grid).to_numpy(dtype=np.float64)
+        known = ~np.isnan(direct)
+        cube[known, position[base], position[quote]] = direct[known]
+        cube[known, position[quote], position[base]] = 1.0 / direct[known]
+    
+    diagonal = np.arange(len(currencies))
+    cube[:, diagonal, diagonal] = 1.0
+    return grid, cube.astype(np.float32)
+
+def get_rate_cube_paths(interval):
+    """Get the (array, sidecar) paths of the rate cube for an interval"""
+    return (os.path.join(RATE_CUBE_DIR, f"exchange_rates_{interval}.npy"),
+            os.path.join(RATE_CUBE_DIR, f"exchange_rates_{interval}.json"))
+
+def create_exchange_rate_cube(intervals=None):
+    """Write the historical exchange-rate cubes as .npy arrays plus JSON sidecars"""
+    if intervals is None:
+        intervals = RATE_CUBE_INTERVALS
+    currencies = FIAT + CRYPTO + METALS
+    
+    for interval in intervals:
+        try:
+            grid, cube = build_rate_cube(currencies, interval)
+            array_path, meta_path = get_rate_cube_paths(interval)
+            Path(RATE_CUBE_DIR).mkdir(parents=True, exist_ok=True)
+            
+            # Fill a memory-mapped temp file, then swap it in so readers never see half an array
+            tmp_path = array_path + ".tmp"
+            out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=cube.shape)
+            out[:] = cube
+            out.flush()
+            offset = out.offset
+            del out
+            os.replace(tmp_path, array_path)
+            
+            # The sidecar describes the raw layout so the frontend can read rows without a .npy parser
+            meta = {
+                "interval": interval,
+                "currencies": currencies,
+                "timestamps": [ts.isoformat() for ts in grid],
+                "shape": list(cube.shape),
+                "dtype": "<f4",
+                "order": "C",
+                "offset": offset,
+                "created_at": datetime.now().isoformat()
+            }
+            atomic_write(meta_path, json.dumps(meta))
+            
+            for path in (array_path, meta_path):
+                shutil.copy2(path, os.path.join(PUBLIC_CHART_DATA, os.path.basename(path)))
+            
+            filled = np.count_nonzero(~np.isnan(cube[-1])) if len(cube) else 0
+            logger.info(f"Exchange rate cube ({interval}) saved: {cube.shape[0]} steps, {filled}/{cube[0].size if len(cube) else 0} latest rates")
+        except Exception as e:
+            logger.error(f"Error creating exchange rate cube ({interval}): {e}")
+
+class RateCube:
+    """Read-only view of a stored exchange-rate cube; the array stays memory-mapped"""
+    
+    def __init__(self, interval="1d"):
+        array_path, meta_path = get_rate_cube_paths(interval)
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+        self.interval = interval
+        self.currencies = meta["currencies"]
+        self.position = {currency: i for i, currency in enumerate(self.currencies)}
+        self.timestamps = pd.DatetimeIndex(pd.to_datetime(meta["timestamps"]))
+        self.rates = np.load(array_path, mmap_mode="r")
+    
+    def _step(self, when):
+        """Index of the last grid step at or before when (latest step if when is None)"""
+        if when is None:
+            return len(self.timestamps) - 1
+        step = self.timestamps.searchsorted(pd.Timestamp(when), side="right") - 1
+        if step < 0:
+            raise KeyError(f"No exchange rates on or before {when}")
+        return step
+    
+    def matrix_at(self, when=None):
+        """Get the base x quote rate matrix in effect at a time as a DataFrame"""
+        return pd.DataFrame(np.asarray(self.rates[self._step(when)], dtype=np.float64),
+                            index=self.currencies, columns=self.currencies)
+    
+    def rate(self, base, quote, when=None):
+        """Get the price of one unit of base in quote at a time, NaN if unknown"""
+        return float(self.rates[self._step(when), self.position[base], self.position[quote]])
     
-    logger.info("Schedule set up successfully")
+    def history(self, base, quote):
+        """Get the full time series of one conversion rate"""
+        values = np.asarray(self.rates[:, self.position[base], self.position[quote]], dtype=np.float64)
+        return pd.Series(values, index=self.timestamps, name=f"{base}{quote}")
 
-def run_scheduled_tasks():
-    """Run scheduled tasks and handle any exceptions"""
+@lru_cache(maxsize=8)
+def _load_rate_cube(interval, mtime_ns):
+    return RateCube(interval)
+
+def load_rate_cube(interval="1d"):
+    """Get the stored rate cube for an interval, reopened only when the file changes; None if missing"""
+    array_path, _ = get_rate_cube_paths(interval)
     try:
-        schedule.run_pending()
-    except Exception as e:
-        logger.error(f"Error running scheduled tasks: {e}")
+        return _load_rate_cube(interval, os.stat(array_path).st_mtime_ns)
+    except FileNotFoundError:
+        return None
+
+def convert_amount(amount, base, quote, when=None, interval="1d"):
+    """Convert an amount between currencies at a historical time using the stored rate cube"""
+    cube = load_rate_cube(interval)
+    if cube is None:
+        return None
+    rate = cube.rate(base, quote, when)
+    return None if np.isnan(rate) else amount * rate
+
+# ----- Scheduling and Main Function -----
+_refreshed_intervals = set()
+_refreshed_lock = threading.Lock()
+
+def refresh_assets(intervals):
+    """Scheduler job: refresh each (interval, symbols) in order and mark their outputs for publishing.
+    
+    Each interval goes through process_asset_list, so batch-capable providers get
+    batched requests; intervals derived from an earlier one come after it and are
+    mostly answered from the cache it just derived.
+    """
+    for interval, symbols in intervals:
+        results = process_asset_list(symbols, interval, merge_outputs=False)
+        if results:
+            with _refreshed_lock:
+                _refreshed_intervals.update([interval] + DERIVED_INTERVALS.get(interval, []))
+
+def publish_refreshed_outputs():
+    """Scheduler job: merge the consolidated outputs of refreshed intervals and publish chart data"""
+    with _refreshed_lock:
+        intervals = sorted(_refreshed_intervals)
+        _refreshed_intervals.clear()
+    if not intervals:
+        return
+    
+    for interval in intervals:
+        merge_output_partitions(interval)
+    ensure_public_chart_data()
+    log_write_stats()
+    save_provider_health()
+
+def get_refresh_series():
+    """Get the (refresh period, priority) of every scheduled (symbol, interval) refresh"""
+    jobs = {}
+    
+    # Nightly refresh of everything a full update covers
+    for config in get_update_configs():
+        for symbol in config["assets"]:
+            jobs[(symbol, config["interval"])] = ("1d", BULK_PRIORITY)
+    
+    # Forex intraday updates (every 4 hours); 5m/15m/30m are derived from 1m
+    for symbol in FOREX_PAIRS:
+        for interval in ["1m", "1h"]:
+            jobs[(symbol, interval)] = ("4h", HOT_PRIORITY + 1)
+    
+    # Hourly updates for important assets; 4h and 1d are derived from 1h, except
+    # where the 1h source's volumes are rolling totals, whose 4h bars are fetched every 4 hours
+    for symbol in FOREX_PAIRS[:10] + CRYPTO[:5]:  # Major forex pairs and top crypto
+        jobs[(symbol, "1h")] = ("1h", HOT_PRIORITY)
+        if not can_derive_from(symbol, "1h"):
+            jobs[(symbol, "4h")] = ("4h", HOT_PRIORITY + 1)
+    
+    return jobs
+
+def can_derive_from(symbol, interval):
+    """Check whether a symbol's coarser intervals can be derived from its interval's series.
+    
+    Series from the configured primary provider are assumed; rolling-volume sources
+    are not resampled (see store_series).
+    """
+    return not get_data_source(get_source_names(symbol, interval)[0]).rolling_volume
+
+def get_refresh_jobs():
+    """Group the scheduled series into one job per (period, base interval, primary provider).
+    
+    A derived interval whose base is refreshed at least as often, and can be derived
+    from, is not scheduled on its own: it follows the base in the base's job. Returns {key: (period, priority,
+    provider, [(interval, symbols), ...])} with each job's base interval first.
+    """
+    series = get_refresh_series()
+    bases = {derived: base for base, intervals in DERIVED_INTERVALS.items() for derived in intervals}
+    
+    def follows_base(symbol, interval):
+        base = bases.get(interval)
+        return (base is not None and (symbol, base) in series and can_derive_from(symbol, base) and
+                INTERVAL_DURATIONS[series[(symbol, base)][0]] <= INTERVAL_DURATIONS[series[(symbol, interval)][0]])
+    
+    jobs = {}
+    for (symbol, interval), (period, priority) in series.items():
+        if follows_base(symbol, interval):
+            continue
+        provider = get_source_names(symbol, interval)[0]
+        key = (period, interval, provider)
+        _, job_priority, _, chain = jobs.setdefault(key, (period, priority, provider, {interval: []}))
+        jobs[key] = (period, min(job_priority, priority), provider, chain)
+        chain[interval].append(symbol)
+        for derived in DERIVED_INTERVALS.get(interval, []):
+            if (symbol, derived) in series and follows_base(symbol, derived):
+                chain.setdefault(derived, []).append(symbol)
+    
+    return {key: (period, priority, provider, list(chain.items()))
+            for key, (period, priority, provider, chain) in jobs.items()}
+
+def setup_schedule():
+    """Set up the job scheduler for data updates"""
+    scheduler = JobScheduler(MAX_WORKERS, budgets=PROVIDER_CONCURRENCY, reserved_workers=SCHEDULER_RESERVED_WORKERS)
+    
+    # Each group of series is refreshed once its bar closes, counted against its
+    # configured primary provider's budget
+    for key, (period, priority, provider, intervals) in get_refresh_jobs().items():
+        scheduler.every(key, refresh_assets, INTERVAL_DURATIONS[period].total_seconds(),
+                        args=(intervals,), delay=SCHEDULER_SETTLE_DELAY, priority=priority,
+                        budget=provider, jitter=SCHEDULER_JITTER)
+    
+    scheduler.every("publish", publish_refreshed_outputs, SCHEDULER_PUBLISH_PERIOD, priority=HOT_PRIORITY)
+    
+    # Daily maintenance after the nightly refresh
+    day = 24 * 60 * 60
+    scheduler.every("consolidate_output", consolidate_output, day, delay=30 * 60)
+    scheduler.every("compact_output", compact_output, day, delay=45 * 60)
+    scheduler.every("exchange_rate_matrix", create_exchange_rate_matrix, day, delay=60 * 60)
+    scheduler.every("exchange_rate_cube", create_exchange_rate_cube, day, delay=60 * 60)
+    
+    logger.info(f"Schedule set up successfully ({len(scheduler.jobs)} jobs)")
+    return scheduler
 
 def main():
     """Main function"""
@@ -1331,21 +4126,26 @@ def main():
     logger.info("Performing initial data fetch...")
     update_all_asset_data()
     consolidate_output()
+    compact_output()
     create_exchange_rate_matrix()
+    create_exchange_rate_cube()
     
     # Set up schedule
-    setup_schedule()
+    scheduler = setup_schedule()
     
     # Run scheduler loop
     try:
         logger.info("Starting scheduler. Press Ctrl+C to exit.")
-        while True:
-            run_scheduled_tasks()
-            time.sleep(60)  # Check every minute
+        scheduler.run_forever()
     except KeyboardInterrupt:
         logger.info("Scheduler stopped by user.")
     except Exception as e:
         logger.error(f"Unexpected error in main loop: {e}")
+    finally:
+        scheduler.stop(timeout=SCHEDULER_STOP_TIMEOUT)
+        logger.info(f"Scheduler stats: {scheduler.stats()}")
+        save_provider_health()
+        close_sessions()
     
     logger.info("Market Data Fetcher stopped")
 
@@ -1357,6 +4157,8 @@ def fetch_single_asset(symbol, interval="1d", force_refresh=False):
     df = fetch_data_with_fallback(symbol, interval, force_refresh)
     if df is not None and not df.empty:
         logger.info(f"Successfully fetched data for {symbol}")
+        merge_interval_outputs(interval)
+        save_provider_health()
         return df
     else:
         logger.warning(f"Failed to fetch data for {symbol}")
@@ -1366,68 +4168,28 @@ def fetch_single_asset(symbol, interval="1d", force_refresh=False):
 def get_latest_price(symbol, quote_currency="USD"):
     """Get the latest price for a symbol in the specified quote currency"""
     try:
-        # First try the direct symbol
-        df = load_from_cache(symbol, "1d")
-        
-        # If not found and we want a non-USD quote, try the pair
-        if (df is None or df.empty) and quote_currency != "USD":
-            pair_symbol = f"{symbol}-{quote_currency}"
-            df = load_from_cache(pair_symbol, "1d")
-            
-            # Also try standard forex format
-            if df is None or df.empty:
-                forex_symbol = f"{symbol}{quote_currency}"
-                df = load_from_cache(forex_symbol, "1d")
-        
-        # If we have data, return the latest price
-        if df is not None and not df.empty:
-            latest = df.iloc[-1]
-            result = {
-                "symbol": symbol,
-                "quote_currency": quote_currency,
-                "price": float(latest["close"]),
-                "timestamp": latest.name.isoformat(),
-                "open": float(latest["open"]),
-                "high": float(latest["high"]),
-                "low": float(latest["low"]),
-                "volume": float(latest["volume"]) if "volume" in latest else 0
-            }
+        # First try the cache
+        result = get_cached_price(symbol, quote_currency)
+        if result is not None:
             return result
         
+        # Symbols that keep failing on every provider are not looked up again until their TTL expires
+        if is_negative_cached(symbol, "1d"):
+            return {"error": f"Price not available for {symbol}/{quote_currency} (recently failed on every provider)"}
+        
         # If not in cache, fetch it fresh
         if quote_currency == "USD":
             df = fetch_data_with_fallback(symbol, "1d")
             if df is not None and not df.empty:
-                latest = df.iloc[-1]
-                result = {
-                    "symbol": symbol,
-                    "quote_currency": "USD",
-                    "price": float(latest["close"]),
-                    "timestamp": latest.name.isoformat(),
-                    "open": float(latest["open"]),
-                    "high": float(latest["high"]),
-                    "low": float(latest["low"]),
-                    "volume": float(latest["volume"]) if "volume" in latest else 0
-                }
-                return result
+                return build_price_result(symbol, "USD", df.iloc[-1])
         # Try direct forex pair
             if len(symbol) == 6 and all(c.isalpha() for c in symbol):
                 base = symbol[:3]
                 quote = symbol[3:]
                 df = fetch_forex_pair(base, quote, "1d")
                 if df is not None and not df.empty:
-                    latest = df.iloc[-1]
-                    result = {
-                        "symbol": symbol,
-                        "base_currency": base,
-                        "quote_currency": quote,
-                        "price": float(latest["close"]),
-                        "timestamp": latest.name.isoformat(),
-                        "open": float(latest["open"]),
-                        "high": float(latest["high"]),
-                        "low": float(latest["low"]),
-                        "volume": float(latest["volume"]) if "volume" in latest else 0
-                    }
+                    result = build_price_result(symbol, quote, df.iloc[-1])
+                    result["base_currency"] = base
                     return result
         
         return {"error": f"Price not available for {symbol}/{quote_currency}"}
@@ -1436,6 +4198,88 @@ def get_latest_price(symbol, quote_currency="USD"):
         logger.error(f"Error in get_latest_price for {symbol}/{quote_currency}: {e}")
         return {"error": str(e)}
 
+def get_cached_price(symbol, quote_currency="USD"):
+    """Get the latest price from the latest-bar index of cached daily data, or None if not cached"""
+    # First try the direct symbol, then for a non-USD quote the pair
+    # and the standard forex format
+    candidates = [symbol]
+    if quote_currency != "USD":
+        candidates += [f"{symbol}-{quote_currency}", f"{symbol}{quote_currency}"]
+    
+    for candidate in candidates:
+        bar = get_latest_bar(candidate, "1d")
+        if bar is not None:
+            return build_price_result(symbol, quote_currency, bar, datetime.fromisoformat(bar["timestamp"]))
+    return None
+
+def build_price_result(symbol, quote_currency, latest, timestamp=None):
+    """Build a latest-price result from a bar (Series row or quote dict)"""
+    if timestamp is None:
+        timestamp = latest.name
+    return {
+        "symbol": symbol,
+        "quote_currency": quote_currency,
+        "price": float(latest["close"]),
+        "timestamp": timestamp.isoformat(),
+        "open": float(latest["open"]),
+        "high": float(latest["high"]),
+        "low": float(latest["low"]),
+        "close": float(latest["close"]),
+        "volume": float(latest["volume"]) if "volume" in latest else 0
+    }
+
+def get_latest_prices(symbols, quote_currency="USD"):
+    """Get the latest prices for many symbols, resolving cache misses with batch quote calls.
+    
+    Returns {symbol: result} where each result has the same shape as get_latest_price.
+    """
+    results = {}
+    misses = []
+    for symbol in dict.fromkeys(symbols):
+        try:
+            result = get_cached_price(symbol, quote_currency)
+        except Exception as e:
+            logger.error(f"Error reading cached price for {symbol}: {e}")
+            result = None
+        if result is not None:
+            results[symbol] = result
+        else:
+            misses.append(symbol)
+    
+    if misses and quote_currency == "USD":
+        # Walk each symbol's source chain, sending everything that lands on the
+        # same provider in one batch before moving leftovers to the next provider
+        chains = {symbol: filter_negative_cached(symbol, "1d", get_source_chain(symbol, "1d")) for symbol in misses}
+        pending = misses
+        while pending:
+            groups = {}
+            for symbol in pending:
+                if chains[symbol]:
+                    source = chains[symbol].pop(0)
+                    groups.setdefault(source.name, (source, []))[1].append(symbol)
+            if not groups:
+                break
+            
+            for source, group in groups.values():
+                try:
+                    quotes = source.fetch_quotes(group)
+                except Exception as e:
+                    logger.error(f"Error fetching batch quotes from {source.name}: {e}")
+                    quotes = {}
+                if quotes:
+                    logger.info(f"Fetched {len(quotes)}/{len(group)} quotes from {source.name} in one batch")
+                for symbol, quote in quotes.items():
+                    results[symbol] = build_price_result(symbol, "USD", quote, quote["timestamp"])
+            
+            pending = [symbol for symbol in pending if symbol not in results]
+    
+    # Anything still missing goes through the single-symbol path
+    for symbol in misses:
+        if symbol not in results:
+            results[symbol] = get_latest_price(symbol, quote_currency)
+    
+    return {symbol: results[symbol] for symbol in dict.fromkeys(symbols)}
+
 def generate_frontend_data():
     """Generate frontend-specific data files for the UI components"""
     try:
@@ -1496,10 +4340,11 @@ def generate_market_overview_data():
             {"name": "Copper", "symbol": "HG"}
         ]
         
-        # Get data for each market
-        us_data = get_market_data(us_markets)
-        eu_data = get_market_data(eu_markets)
-        commodities_data = get_market_data(commodities)
+        # Get data for each market, resolving all prices in one batch
+        prices = get_latest_prices([market["symbol"] for market in us_markets + eu_markets + commodities])
+        us_data = get_market_data(us_markets, prices)
+        eu_data = get_market_data(eu_markets, prices)
+        commodities_data = get_market_data(commodities, prices)
         
         # Save to JSON files
         market_overview = {
@@ -1517,16 +4362,18 @@ def generate_market_overview_data():
     except Exception as e:
         logger.error(f"Error generating market overview data: {e}")
 
-def get_market_data(markets):
+def get_market_data(markets, prices=None):
     """Get market data for a list of markets"""
     result = []
+    if prices is None:
+        prices = get_latest_prices([market["symbol"] for market in markets])
     
     for market in markets:
         try:
             symbol = market["symbol"]
             
             # Get latest price data
-            price_data = get_latest_price(symbol)
+            price_data = prices[symbol]
             
             if "error" not in price_data:
                 # Format value based on the price
@@ -1589,11 +4436,12 @@ def generate_stock_ticker_data():
         ]
         
         result = []
+        prices = get_latest_prices(stocks)
         
         for symbol in stocks:
             try:
                 # Get latest price data
-                price_data = get_latest_price(symbol)
+                price_data = prices[symbol]
                 
                 if "error" not in price_data:
                     # Format price based on the symbol
@@ -1916,11 +4764,12 @@ def create_summary_file():
             {"name": "XRP", "symbol": "XRP"}
         ]
         
-        # Get data for each category
-        indices_data = get_summary_data(indices)
-        forex_data = get_summary_data(forex)
-        commodities_data = get_summary_data(commodities)
-        crypto_data = get_summary_data(crypto)
+        # Get data for each category, resolving all prices in one batch
+        prices = get_latest_prices([item["symbol"] for item in indices + forex + commodities + crypto])
+        indices_data = get_summary_data(indices, prices)
+        forex_data = get_summary_data(forex, prices)
+        commodities_data = get_summary_data(commodities, prices)
+        crypto_data = get_summary_data(crypto, prices)
         
         # Create summary object
         summary = {
@@ -1940,14 +4789,16 @@ def create_summary_file():
     except Exception as e:
         logger.error(f"Error creating summary file: {e}")
 
-def get_summary_data(items):
+def get_summary_data(items, prices=None):
     """Get summary data for a list of market items"""
     result = []
+    if prices is None:
+        prices = get_latest_prices([item["symbol"] for item in items])
     
     for item in items:
         try:
             # Get latest price data
-            price_data = get_latest_price(item["symbol"])
+            price_data = prices[item["symbol"]]
             
             if "error" not in price_data:
                 # Calculate percent change
@@ -1999,14 +4850,25 @@ if __name__ == "__main__":
     parser.add_argument('--interval', type=str, default='1d', choices=INTERVALS, help='Data interval (1m, 5m, 15m, 30m, 1h, 4h, 1d)')
     parser.add_argument('--days', type=int, default=7, help='Number of days to fetch data for')
     parser.add_argument('--schedule', action='store_true', help='Run scheduler')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='Use the asyncio fetch engine for updates')
+    parser.add_argument('--compact', action='store_true', help='Compact dated output directories into the archive')
+    parser.add_argument('--retention-days', type=int, default=None,
+                        help='With --compact, also delete archived dated directories older than this many days')
+    parser.add_argument('--dead-symbols', action='store_true', help='Report symbols that fail on every provider')
+    parser.add_argument('--benchmark', action='store_true', help='Benchmark the output serializers per 10k bars')
     
     args = parser.parse_args()
     
     if args.update:
         logger.info("Updating all market data...")
-        update_all_asset_data()
+        if args.use_async:
+            asyncio.run(update_all_asset_data_async())
+        else:
+            update_all_asset_data()
         consolidate_output()
+        compact_output()
         create_exchange_rate_matrix()
+        create_exchange_rate_cube()
         
     elif args.frontend:
         logger.info("Generating frontend data...")
@@ -2042,9 +4904,24 @@ if __name__ == "__main__":
         logger.info("Running scheduler...")
         main()
         
+    elif args.dead_symbols:
+        for symbol, interval in report_dead_symbols():
+            print(f"{symbol} ({interval})")
+        
+    elif args.compact:
+        logger.info("Compacting dated output into the archive...")
+        compact_output(args.retention_days)
+        
+    elif args.benchmark:
+        for name, result in benchmark_serializers().items():
+            print(f"{name}: {result}")
+        
     else:
         # Default: update and generate frontend data
         logger.info("Updating market data and generating frontend data...")
-        update_all_asset_data()
+        if args.use_async:
+            asyncio.run(update_all_asset_data_async())
+        else:
+            update_all_asset_data()
         generate_frontend_data()
         create_summary_file()
\ No newline at end of file
@@ -0,0 +1,224 @@
+"""Tests for job_scheduler, driven by a fake clock instead of real time"""
+
+import threading
+
+import pytest
+
+from job_scheduler import BULK_PRIORITY, HOT_PRIORITY, JobScheduler, next_bar_close
+
+HOUR = 3600
+WAIT = 5  # Real seconds to wait for worker threads before failing a test
+
+class FakeClock:
+    """Clock the test moves by hand"""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class Gate:
+    """Job function that blocks until released and records each call"""
+
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Semaphore(0)
+        self.release = threading.Event()
+
+    def __call__(self, *args):
+        self.calls.append(args)
+        self.started.release()
+        assert self.release.wait(WAIT)
+
+@pytest.fixture
+def clock():
+    return FakeClock(10 * HOUR)
+
+def make_scheduler(clock, max_workers=4, **kwargs):
+    return JobScheduler(max_workers, clock=clock, **kwargs)
+
+def dispatch(scheduler):
+    """Run one dispatch pass at the fake clock's time"""
+    with scheduler.cond:
+        scheduler._dispatch(scheduler.clock())
+
+def wait_until(scheduler, predicate):
+    with scheduler.cond:
+        assert scheduler.cond.wait_for(lambda: predicate(scheduler), WAIT)
+
+def test_next_bar_close():
+    assert next_bar_close(HOUR, 10 * HOUR) == 11 * HOUR
+    assert next_bar_close(HOUR, 10 * HOUR + 1) == 11 * HOUR
+    assert next_bar_close(HOUR, 10 * HOUR, delay=60) == 10 * HOUR + 60
+    assert next_bar_close(HOUR, 10 * HOUR + 60, delay=60) == 11 * HOUR + 60
+
+def test_job_waits_for_its_bar_close(clock):
+    scheduler = make_scheduler(clock)
+    gate = Gate()
+    gate.release.set()
+    job = scheduler.every("job", gate, HOUR, args=("BTC",), delay=60)
+    assert job.due == 10 * HOUR + 60
+
+    clock.now = 10 * HOUR + 59
+    dispatch(scheduler)
+    assert job.state == "waiting"
+
+    clock.now = 10 * HOUR + 60
+    dispatch(scheduler)
+    wait_until(scheduler, lambda s: job.runs == 1)
+    assert gate.calls == [("BTC",)]
+    assert job.state == "waiting"
+    assert job.due == 11 * HOUR + 60
+    scheduler.stop()
+
+def test_trigger_runs_waiting_job_now(clock):
+    scheduler = make_scheduler(clock)
+    gate = Gate()
+    gate.release.set()
+    job = scheduler.every("job", gate, HOUR)
+
+    scheduler.trigger("job")
+    assert job.state == "ready"
+    dispatch(scheduler)
+    wait_until(scheduler, lambda s: job.runs == 1)
+
+    # The stale timer entry left by trigger() does not cause a second run
+    clock.now = 11 * HOUR
+    with scheduler.cond:
+        assert job.due == 11 * HOUR
+        scheduler.timers.sort()
+        assert [entry[0] for entry in scheduler.timers] == [11 * HOUR, 11 * HOUR]
+    dispatch(scheduler)
+    wait_until(scheduler, lambda s: job.runs == 2)
+    assert len(gate.calls) == 2
+    scheduler.stop()
+
+def test_trigger_while_queued_is_coalesced(clock):
+    scheduler = make_scheduler(clock)
+    gate = Gate()
+    gate.release.set()
+    job = scheduler.every("job", gate, HOUR, run_now=True)
+
+    scheduler.trigger("job")
+    scheduler.trigger("job")
+    assert job.coalesced == 2
+    dispatch(scheduler)
+    wait_until(scheduler, lambda s: job.runs == 1)
+    assert len(gate.calls) == 1
+    scheduler.stop()
+
+def test_trigger_while_running_reruns_once(clock):
+    scheduler = make_scheduler(clock)
+    gate = Gate()
+    job = scheduler.every("job", gate, HOUR, run_now=True)
+    dispatch(scheduler)
+    assert gate.started.acquire(timeout=WAIT)
+
+    scheduler.trigger("job")
+    scheduler.trigger("job")
+    assert job.rerun
+    gate.release.set()
+    wait_until(scheduler, lambda s: job.runs == 1 and job.state == "ready")
+
+    dispatch(scheduler)
+    wait_until(scheduler, lambda s: job.runs == 2)
+    assert len(gate.calls) == 2
+    assert job.state == "waiting"
+    scheduler.stop()
+
+def test_overdue_bar_closes_are_coalesced(clock):
+    scheduler = make_scheduler(clock)
+    gate = Gate()
+    job = scheduler.every("job", gate, HOUR, run_now=True)
+    dispatch(scheduler)
+    assert gate.started.acquire(timeout=WAIT)
+
+    # Three bar closes pass while the job runs; it is armed for the next one only
+    clock.now = 13 * HOUR + 30
+    gate.release.set()
+    wait_until(scheduler, lambda s: job.runs == 1)
+    assert job.coalesced == 1
+    assert job.due == 14 * HOUR
+    with scheduler.cond:
+        assert len(scheduler.timers) == 1
+    scheduler.stop()
+
+def test_budget_limits_concurrent_jobs(clock):
+    scheduler = make_scheduler(clock, budgets={"TwelveData": 1})
+    gates = [Gate() for _ in range(3)]
+    jobs = [scheduler.every("td-1", gates[0], HOUR, budget="TwelveData", run_now=True),
+            scheduler.every("td-2", gates[1], HOUR, budget="TwelveData", run_now=True),
+            scheduler.every("yahoo", gates[2], HOUR, budget="YahooFinance", run_now=True)]
+    dispatch(scheduler)
+
+    # The blocked job stays queued without holding up the one behind it
+    assert [job.state for job in jobs] == ["running", "ready", "running"]
+    assert scheduler.budget_in_use == {"TwelveData": 1, "YahooFinance": 1}
+
+    gates[0].release.set()
+    wait_until(scheduler, lambda s: jobs[0].runs == 1)
+    dispatch(scheduler)
+    assert jobs[1].state == "running"
+
+    for gate in gates:
+        gate.release.set()
+    assert scheduler.stop(timeout=WAIT)
+    assert scheduler.budget_in_use == {"TwelveData": 0, "YahooFinance": 0}
+
+def test_bulk_jobs_leave_reserved_workers_free(clock):
+    scheduler = make_scheduler(clock, max_workers=3, reserved_workers=1)
+    bulk = [Gate() for _ in range(3)]
+    hot = Gate()
+    bulk_jobs = [scheduler.every(f"bulk-{i}", gate, HOUR, priority=BULK_PRIORITY, run_now=True)
+                 for i, gate in enumerate(bulk)]
+    dispatch(scheduler)
+    assert [job.state for job in bulk_jobs] == ["running", "running", "ready"]
+
+    hot_job = scheduler.every("hot", hot, HOUR, priority=HOT_PRIORITY, run_now=True)
+    dispatch(scheduler)
+    assert hot_job.state == "running"
+    assert scheduler.running == 3
+
+    for gate in bulk + [hot]:
+        gate.release.set()
+    assert scheduler.stop(timeout=WAIT)
+
+def test_hot_jobs_dispatch_first(clock):
+    scheduler = make_scheduler(clock, max_workers=1)
+    order = []
+    scheduler.every("bulk", lambda: order.append("bulk"), HOUR, priority=BULK_PRIORITY, run_now=True)
+    scheduler.every("hot", lambda: order.append("hot"), HOUR, priority=HOT_PRIORITY, run_now=True)
+    dispatch(scheduler)
+    wait_until(scheduler, lambda s: s.running == 0)
+    dispatch(scheduler)
+    wait_until(scheduler, lambda s: s.running == 0 and len(order) == 2)
+    assert order == ["hot", "bulk"]
+    scheduler.stop()
+
+def test_stop_waits_for_running_jobs(clock):
+    scheduler = make_scheduler(clock)
+    gate = Gate()
+    job = scheduler.every("job", gate, HOUR, run_now=True)
+    dispatch(scheduler)
+    assert gate.started.acquire(timeout=WAIT)
+
+    assert not scheduler.stop(timeout=0.05)
+    assert job.state == "running"
+
+    gate.release.set()
+    assert scheduler.stop(timeout=WAIT)
+    assert job.runs == 1
+
+def test_failing_job_is_rearmed(clock):
+    scheduler = make_scheduler(clock)
+
+    def fail():
+        raise RuntimeError("provider down")
+
+    job = scheduler.every("job", fail, HOUR, run_now=True)
+    dispatch(scheduler)
+    wait_until(scheduler, lambda s: job.runs == 1)
+    assert job.state == "waiting"
+    assert job.due == 11 * HOUR
+    scheduler.stop()